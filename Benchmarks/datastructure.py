@@ -0,0 +1,146 @@
+import argparse
+import tempfile
+import pathlib
+import time
+
+from Modules import DataStructure
+from Modules import Synthetic
+from Modules import Benchmark
+
+c_baseline_dir = "Benchmarks/baselines"
+c_scales = [1000, 10000]
+c_players = 100
+c_repeat = 3
+c_seed = 0
+
+
+def parse_arguments():
+	parser = argparse.ArgumentParser(description="Microbenchmarks for DataStructure operations on synthetic states")
+
+	parser.add_argument(
+		"--scales", "-n", help=f"Server counts to generate states for (defaults to {' '.join(map(str, c_scales))}).", nargs='+', required=False, type=int,
+		default=c_scales
+	)
+
+	parser.add_argument(
+		"--players", "-p", help=f"Average amount of seen players per server (defaults to {c_players}).", required=False, type=int,
+		default=c_players
+	)
+
+	parser.add_argument(
+		"--modded-rate", help=f"Fraction of servers with mods (defaults to {Synthetic.c_modded_rate}).", required=False, type=float,
+		default=Synthetic.c_modded_rate
+	)
+
+	parser.add_argument(
+		"--repeat", "-r", help=f"How many times each operation is timed, the best time is kept (defaults to {c_repeat}).", required=False, type=int,
+		default=c_repeat
+	)
+
+	parser.add_argument(
+		"--seed", help=f"Seed for the synthetic state (defaults to {c_seed}).", required=False, type=int,
+		default=c_seed
+	)
+
+	parser.add_argument(
+		"--report", "-o", help="Write the JSON report to this file instead of stdout.", required=False, type=str,
+		default=None
+	)
+
+	parser.add_argument(
+		"--save-baseline", help=f"Store the report as a named baseline in \"{c_baseline_dir}\".", required=False, type=str,
+		default=None
+	)
+
+	parser.add_argument(
+		"--compare", help="Compare the report against a named baseline.", required=False, type=str,
+		default=None
+	)
+
+	return parser.parse_args()
+
+
+def measure(function, repeat, operations=1):
+	best = None
+
+	for _ in range(repeat):
+		start = time.perf_counter()
+		function()
+		elapsed = time.perf_counter() - start
+		best = elapsed if best == None else min(best, elapsed)
+
+	return {"seconds": best, "operations": operations, "per_operation": best / operations}
+
+
+def benchmark_scale(arguments, servers):
+	generator = Synthetic.Generator(arguments.seed, arguments.players, arguments.modded_rate)
+
+	start = time.perf_counter()
+	host_list = generator.host_list(servers)
+	results = {"generate": time.perf_counter() - start}
+
+	repeat = arguments.repeat
+	server_list = list(host_list.server_iterator())
+	addresses = [(server.host.address, server.port) for server in server_list]
+	statuses = [generator.status() for _ in range(min(servers, 1000))]
+
+	def lookup_existing():
+		for address, port in addresses:
+			host_list.get_or_add_server(address, port)
+
+	def add_new():
+		fresh = DataStructure.HostList()
+		for address, port in addresses:
+			fresh.get_or_add_server(address, port)
+
+	def parse_status():
+		for server, status in zip(server_list, statuses):
+			server.parse_status(status)
+
+	def iterate():
+		for _ in host_list.server_iterator():
+			pass
+
+	def play_time():
+		for server in server_list:
+			server.get_play_time()
+
+	results["get_or_add_server.existing"] = measure(lookup_existing, repeat, len(addresses))
+	results["get_or_add_server.new"] = measure(add_new, repeat, len(addresses))
+	results["parse_status"] = measure(parse_status, repeat, len(statuses))
+	results["server_iterator"] = measure(iterate, repeat, servers)
+	results["server_count"] = measure(host_list.server_count, repeat)
+	results["get_play_time"] = measure(play_time, repeat, servers)
+	results["get_dict"] = measure(lambda: DataStructure.get_dict(host_list), repeat)
+
+	with tempfile.TemporaryDirectory() as directory:
+		filename = str(pathlib.Path(directory) / "state.pickle")
+
+		results["serialize_file"] = measure(lambda: host_list.serialize_file(filename), repeat)
+		results["deserialize_file"] = measure(lambda: DataStructure.HostList().deserialize_file(filename), repeat)
+		results["file_size"] = pathlib.Path(filename).stat().st_size
+
+	results["players"] = sum(len(server.players) for server in server_list)
+	return results
+
+
+def main():
+	arguments = parse_arguments()
+
+	report = {"environment": Benchmark.environment(), "settings": vars(arguments).copy()}
+	with Benchmark.Measurement() as measurement:
+		for servers in arguments.scales:
+			report[str(servers)] = benchmark_scale(arguments, servers)
+
+	report["total"] = measurement.get_dict()
+	Benchmark.write_report(report, arguments.report)
+
+	if arguments.save_baseline:
+		Benchmark.save_baseline(report, f"{c_baseline_dir}/{arguments.save_baseline}.json")
+
+	if arguments.compare:
+		Benchmark.print_comparison(report, f"{c_baseline_dir}/{arguments.compare}.json")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,226 @@
+import argparse
+import time
+
+from Modules import DataStructure
+from Modules import Synthetic
+from Modules import Benchmark
+from Modules import Elements
+
+import ServerTracker
+
+c_baseline_dir = "Benchmarks/baselines"
+c_scales = [1000, 10000, 50000]
+c_players = 10
+c_detail_players = [100, 1000, 10000]
+c_frames = 30
+c_rows = 50
+c_columns = 160
+c_seed = 0
+
+
+def parse_arguments():
+	parser = argparse.ArgumentParser(description="Measures the frame time of the tracker's interface on a headless screen with synthetic states")
+
+	parser.add_argument(
+		"--scales", "-n", help=f"Server counts to generate states for (defaults to {' '.join(map(str, c_scales))}).", nargs='+', required=False, type=int,
+		default=c_scales
+	)
+
+	parser.add_argument(
+		"--players", "-p", help=f"Average amount of seen players per server in those states (defaults to {c_players}).", required=False, type=int,
+		default=c_players
+	)
+
+	parser.add_argument(
+		"--detail-players", help=f"Player counts of the server shown in the detail view (defaults to {' '.join(map(str, c_detail_players))}).", nargs='+', required=False, type=int,
+		default=c_detail_players
+	)
+
+	parser.add_argument(
+		"--frames", "-f", help=f"Frames drawn per scenario (defaults to {c_frames}).", required=False, type=int,
+		default=c_frames
+	)
+
+	parser.add_argument(
+		"--size", help=f"Screen rows and columns (defaults to {c_rows} {c_columns}).", nargs=2, required=False, type=int,
+		default=[c_rows, c_columns]
+	)
+
+	parser.add_argument(
+		"--seed", help=f"Seed for the synthetic states (defaults to {c_seed}).", required=False, type=int,
+		default=c_seed
+	)
+
+	parser.add_argument(
+		"--report", "-o", help="Write the JSON report to this file instead of stdout.", required=False, type=str,
+		default=None
+	)
+
+	parser.add_argument(
+		"--save-baseline", help=f"Store the report as a named baseline in \"{c_baseline_dir}\".", required=False, type=str,
+		default=None
+	)
+
+	parser.add_argument(
+		"--compare", help="Compare the report against a named baseline.", required=False, type=str,
+		default=None
+	)
+
+	return parser.parse_args()
+
+
+class HeadlessScreen:
+	# Stands in for a curses window, only counts what would have been written
+	def __init__(self, rows, columns):
+		self.size = (rows, columns)
+		self.writes = 0
+
+	def getmaxyx(self):
+		return self.size
+
+	def subwin(self, *_):
+		return HeadlessScreen(*self.size)
+
+	def resize(self, rows, columns):
+		pass
+
+	def mvwin(self, y, x):
+		pass
+
+	def addstr(self, *_):
+		self.writes += 1
+
+	def chgat(self, *_):
+		self.writes += 1
+
+	def erase(self):
+		pass
+
+	def move(self, y, x):
+		pass
+
+	def clrtoeol(self):
+		pass
+
+	def refresh(self):
+		pass
+
+
+class HeadlessPalette:
+	# Palette needs an initialized curses screen for its color pairs
+	def get(self, key):
+		return 0
+
+
+class View:
+	def __init__(self, size):
+		self.screen = HeadlessScreen(*size)
+		self.renderer = Elements.Renderer(self.screen)
+		self.scroll_frame = Elements.ScrollingFrame(self.screen)
+		self.palette = HeadlessPalette()
+		self.tick = 0
+
+	def draw(self, items, scroll=0):
+		# Same steps as a frame of ServerTracker.interface, the tick moves every frame like it does while the user is active
+		self.tick += 1
+
+		frame = self.renderer.new_frame()
+		[sy, sx] = frame.getmaxyx()
+		scroll_frame = self.scroll_frame
+		scroll_frame.resize(sx - 1, sy - 1)
+		scroll_frame.move(0, 0)
+		scroll_frame.set_scroll(0, scroll)
+		scroll_frame.items = items
+
+		ServerTracker.draw_items(frame, scroll_frame, self.tick, self.palette)
+
+		status = f"Sort Mode: {ServerTracker.c_sort_modes[0][0]}, {ServerTracker.format_totals(ServerTracker.g_state.host_list.rollup.get())}"
+		frame.addstr(sy - 1, 0, ServerTracker.spin_text(status, sx - 1, self.tick))
+		self.renderer.present(frame, time.time())
+
+
+def measure_frames(frames, function):
+	times = []
+
+	for _ in range(frames):
+		start = time.perf_counter()
+		function()
+		times.append(time.perf_counter() - start)
+
+	return Benchmark.summarize(times)
+
+
+def benchmark_list(arguments, servers):
+	generator = Synthetic.Generator(arguments.seed, arguments.players)
+	host_list = generator.host_list(servers)
+	ServerTracker.g_state.host_list = host_list
+
+	view = View(arguments.size)
+	results = {"players": sum(len(server.players) for server in host_list.server_iterator())}
+
+	# Every frame of the list view rebuilds and sorts the list, like the interface does whenever something changed
+	results["sort_modes"] = {
+		name: measure_frames(arguments.frames, lambda: view.draw(ServerTracker.build_server_list({}, key)))
+		for name, key in ServerTracker.c_sort_modes
+	}
+
+	items = ServerTracker.build_server_list({}, ServerTracker.c_sort_modes[0][1])
+	results["draw_only"] = measure_frames(arguments.frames, lambda: view.draw(items))
+
+	results["scroll"] = {
+		name: measure_frames(arguments.frames, lambda: view.draw(items, int(position * len(items))))
+		for name, position in [("top", 0), ("middle", 0.5), ("end", 1)]
+	}
+
+	filter_query = ServerTracker.parse_filter("online")
+	results["filter_online"] = measure_frames(arguments.frames, lambda: view.draw(ServerTracker.build_server_list(filter_query, ServerTracker.c_sort_modes[0][1])))
+
+	return results
+
+
+def benchmark_detail(arguments, players):
+	generator = Synthetic.Generator(arguments.seed, 0)
+	host_list = DataStructure.HostList()
+	now = time.time()
+
+	server = generator.server(host_list.get_or_add_host("10.0.0.1"), 25565, now)
+	server.players = [generator.player(server, now) for _ in range(players)]
+	server.recount()
+	ServerTracker.g_state.host_list = host_list
+
+	view = View(arguments.size)
+	info = ServerTracker.build_server_info(server)
+
+	return {
+		# The interface only rebuilds the view when the server's revision changes
+		"build": measure_frames(arguments.frames, lambda: ServerTracker.build_server_info(server)),
+		"top": measure_frames(arguments.frames, lambda: view.draw(info)),
+		"end": measure_frames(arguments.frames, lambda: view.draw(info, len(info))),
+	}
+
+
+def main():
+	arguments = parse_arguments()
+
+	report = {"environment": Benchmark.environment(), "settings": vars(arguments).copy()}
+	report["list"] = {str(servers): benchmark_list(arguments, servers) for servers in arguments.scales}
+	report["detail"] = {str(players): benchmark_detail(arguments, players) for players in arguments.detail_players}
+
+	# p50 frame time against the state size, the list's first sort mode and the detail view's first page
+	report["scaling"] = {
+		"list": [[servers, report["list"][str(servers)]["sort_modes"][ServerTracker.c_sort_modes[0][0]]["p50"]] for servers in arguments.scales],
+		"list_draw_only": [[servers, report["list"][str(servers)]["draw_only"]["p50"]] for servers in arguments.scales],
+		"detail": [[players, report["detail"][str(players)]["top"]["p50"]] for players in arguments.detail_players],
+	}
+
+	Benchmark.write_report(report, arguments.report)
+
+	if arguments.save_baseline:
+		Benchmark.save_baseline(report, f"{c_baseline_dir}/{arguments.save_baseline}.json")
+
+	if arguments.compare:
+		Benchmark.print_comparison(report, f"{c_baseline_dir}/{arguments.compare}.json")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,151 @@
+import ipaddress
+import tracemalloc
+import argparse
+import asyncio
+import time
+import re
+
+from Modules import Benchmark
+
+import ServerScanner
+
+c_baseline_dir = "Benchmarks/baselines"
+c_sample_file = "Assets/nmap_example.xml"
+c_scales = [1000, 10000, 100000]
+c_chunk_size = 65536
+
+
+def parse_arguments():
+	parser = argparse.ArgumentParser(description="Measures ServerScanner's incremental Nmap XML parser on a recorded scan and on scaled up copies of it")
+
+	parser.add_argument(
+		"--sample", help=f"Recorded Nmap XML output (\"nmap -oX -\") the hosts are taken from (defaults to \"{c_sample_file}\").", required=False, type=str,
+		default=c_sample_file
+	)
+
+	parser.add_argument(
+		"--scales", help=f"Host counts of the generated scans (defaults to {' '.join(map(str, c_scales))}).", nargs='+', required=False, type=int,
+		default=c_scales
+	)
+
+	parser.add_argument(
+		"--chunk-size", help=f"Bytes fed to the parser at a time (defaults to {c_chunk_size}).", required=False, type=int,
+		default=c_chunk_size
+	)
+
+	parser.add_argument(
+		"--report", "-o", help="Write the JSON report to this file instead of stdout.", required=False, type=str,
+		default=None
+	)
+
+	parser.add_argument(
+		"--save-baseline", help=f"Store the report as a named baseline in \"{c_baseline_dir}\".", required=False, type=str,
+		default=None
+	)
+
+	parser.add_argument(
+		"--compare", help="Compare the report against a named baseline.", required=False, type=str,
+		default=None
+	)
+
+	return parser.parse_args()
+
+
+class ChunkStream:
+	# Stands in for the Nmap process' stdout, read_nmap_hosts only needs an async read()
+	def __init__(self, chunks):
+		self.chunks = iter(chunks)
+		self.buffer = b""
+
+	async def read(self, size):
+		while len(self.buffer) < size:
+			chunk = next(self.chunks, None)
+			if chunk == None:
+				break
+			self.buffer += chunk
+
+		[data, self.buffer] = [self.buffer[:size], self.buffer[size:]]
+		return data
+
+
+def generate_scan(sample, hosts):
+	# Repeats the sample's hosts (and their hints) with new addresses, the same order Nmap reports them in
+	header = sample[:sample.index("<hosthint>")]
+	footer = sample[sample.index("<runstats>"):]
+	hints = re.findall(r"<hosthint>.*?</hosthint>\n", sample, re.DOTALL)
+	reports = re.findall(r"<host .*?</host>\n", sample, re.DOTALL)
+	addresses = re.compile(r'addr="[0-9.]+" addrtype="ipv4"')
+	base = ipaddress.IPv4Address("10.0.0.0")
+
+	yield header.encode()
+
+	for idx in range(hosts):
+		address = f'addr="{base + idx}" addrtype="ipv4"'
+		template = idx % len(reports)
+		yield (addresses.sub(address, hints[template % len(hints)]) + addresses.sub(address, reports[template])).encode()
+
+	yield footer.encode()
+
+
+async def collect(chunks, chunk_size):
+	return [host async for host in ServerScanner.read_nmap_hosts(ChunkStream(chunks), chunk_size)]
+
+
+async def count(chunks, chunk_size):
+	# Only counts, so the parser's own memory is all that's left to grow with the scan
+	hosts = 0
+	ports = 0
+
+	async for [_address, host_ports] in ServerScanner.read_nmap_hosts(ChunkStream(chunks), chunk_size):
+		hosts += 1
+		ports += len(host_ports)
+
+	return hosts, ports
+
+
+def measure(sample, scale, chunk_size):
+	start = time.perf_counter()
+	[hosts, ports] = asyncio.run(count(generate_scan(sample, scale), chunk_size))
+	seconds = time.perf_counter() - start
+
+	# Traced separately since tracemalloc slows the parser down several times
+	tracemalloc.start()
+	asyncio.run(count(generate_scan(sample, scale), chunk_size))
+	[_current, peak] = tracemalloc.get_traced_memory()
+	tracemalloc.stop()
+
+	return {
+		"hosts": hosts,
+		"open_ports": ports,
+		"seconds": seconds,
+		"hosts_per_second": seconds and hosts / seconds,
+		"parser_peak_memory": peak, # Should stay about the same between scales
+	}
+
+
+def main():
+	arguments = parse_arguments()
+
+	with open(arguments.sample, "r", encoding="utf-8") as file:
+		sample = file.read()
+
+	# The recorded scan in tiny chunks, so elements get split across feeds
+	hosts = asyncio.run(collect([sample.encode()], 7))
+	report = {
+		"environment": Benchmark.environment(),
+		"settings": vars(arguments).copy(),
+		"sample": [{"address": address, "ports": ports} for address, ports in hosts],
+		"scales": {str(scale): measure(sample, scale, arguments.chunk_size) for scale in arguments.scales},
+	}
+
+	Benchmark.write_report(report, arguments.report)
+
+	if arguments.save_baseline:
+		Benchmark.save_baseline(report, f"{c_baseline_dir}/{arguments.save_baseline}.json")
+
+	if arguments.compare:
+		Benchmark.print_comparison(report, f"{c_baseline_dir}/{arguments.compare}.json")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,228 @@
+import multiprocessing
+import contextlib
+import argparse
+import tempfile
+import asyncio
+import pathlib
+import time
+
+from Modules import DataStructure
+from Modules import FakeServer
+from Modules import Benchmark
+from Modules import Scheduler
+from Modules import Protocol
+from Modules import Records
+
+c_baseline_dir = "Benchmarks/baselines"
+c_pipelines = ["tracker", "scanner"]
+c_servers = 256
+c_runners = 64
+c_cycles = 3
+c_timeout = 2
+
+
+def parse_arguments():
+	parser = argparse.ArgumentParser(description="End-to-end benchmark of the tracker and scanner pipelines against local fake servers")
+
+	parser.add_argument(
+		"--pipeline", "-P", help="Which pipelines to benchmark (defaults to all).", nargs='+', required=False, type=str,
+		choices=c_pipelines, default=c_pipelines
+	)
+
+	parser.add_argument(
+		"--servers", "-n", help=f"Amount of fake servers (defaults to {c_servers}).", required=False, type=int,
+		default=c_servers
+	)
+
+	parser.add_argument(
+		"--base-port", help="First port of a contiguous range for the fake servers (defaults to random ports).", required=False, type=int,
+		default=0
+	)
+
+	parser.add_argument(
+		"--runners", "-r", help=f"Task count (defaults to {c_runners}).", required=False, type=int,
+		default=c_runners
+	)
+
+	parser.add_argument(
+		"--cycles", "-c", help=f"Tracker cycles over every server (defaults to {c_cycles}).", required=False, type=int,
+		default=c_cycles
+	)
+
+	parser.add_argument(
+		"--timeout", "-T", help=f"Status request timeout (defaults to {c_timeout}).", required=False, type=float,
+		default=c_timeout
+	)
+
+	parser.add_argument("--online", help="Online players per server.", required=False, type=int, default=20)
+	parser.add_argument("--sample", help="Player sample size per server.", required=False, type=int, default=12)
+	parser.add_argument("--mods", help="Mods per server.", required=False, type=int, default=0)
+	parser.add_argument("--mod-format", help="Mod list format.", required=False, type=str, choices=["forge", "fml"], default="forge")
+	parser.add_argument("--favicon-size", help="Favicon size in bytes.", required=False, type=int, default=0)
+	parser.add_argument("--latency", help="Server side latency in seconds.", required=False, type=float, default=0)
+	parser.add_argument("--jitter", help="Server side latency jitter in seconds.", required=False, type=float, default=0)
+	parser.add_argument("--failure-rate", help="Fraction of connections closed right away.", required=False, type=float, default=0)
+	parser.add_argument("--timeout-rate", help="Fraction of connections that never get a response.", required=False, type=float, default=0)
+
+	parser.add_argument(
+		"--capture", help="Write the tracker's status responses to this record file, for use with Benchmarks.replay.", required=False, type=str,
+		default=None
+	)
+
+	parser.add_argument(
+		"--report", "-o", help="Write the JSON report to this file instead of stdout.", required=False, type=str,
+		default=None
+	)
+
+	parser.add_argument(
+		"--save-baseline", help=f"Store the report as a named baseline in \"{c_baseline_dir}\".", required=False, type=str,
+		default=None
+	)
+
+	parser.add_argument(
+		"--compare", help="Compare the report against a named baseline.", required=False, type=str,
+		default=None
+	)
+
+	return parser.parse_args()
+
+
+@contextlib.contextmanager
+def timed_status(latencies, failures):
+	# Wraps the status request used by every pipeline to collect per-probe latency
+	original = Protocol.async_server_status
+
+	async def wrapper(*args, **kwargs):
+		start = time.perf_counter()
+		result = await original(*args, **kwargs)
+		latencies.append(time.perf_counter() - start)
+		if not result:
+			failures.append(1)
+		return result
+
+	Protocol.async_server_status = wrapper
+	try:
+		yield
+	finally:
+		Protocol.async_server_status = original
+
+
+async def run_tracker(arguments, ports):
+	host_list = DataStructure.HostList()
+	for port in ports:
+		host_list.get_or_add_server("127.0.0.1", port)
+
+	capture = arguments.capture and Records.RecordWriter(arguments.capture, flush_interval=1)
+
+	async def probe(server):
+		result = await Protocol.async_server_status(server.host.address, server.port, timeout=arguments.timeout)
+
+		if capture:
+			capture.write(server.host.address, server.port, result or None)
+
+		if result:
+			server.parse_status(result)
+		else:
+			server.set_inactive()
+
+	pool = Scheduler.WorkerPool(
+		probe, Scheduler.FairQueue(lambda server: server.host.address, arguments.runners),
+		arguments.runners, arguments.runners, arguments.runners * 2, arguments.runners
+	)
+	task = asyncio.create_task(pool.run())
+
+	for cycle in range(arguments.cycles):
+		for server in host_list.server_iterator():
+			pool.put_nowait(server)
+
+		while pool.processed < (cycle + 1) * len(ports):
+			await asyncio.sleep(0.01)
+
+	pool.stop()
+	task.cancel()
+
+	if capture:
+		capture.close()
+
+	return pool.processed
+
+
+async def run_scanner(arguments, ports):
+	import ServerScanner
+
+	state = ServerScanner.g_state
+	with tempfile.TemporaryDirectory() as directory:
+		output = str(pathlib.Path(directory) / "scan_results.jsonl")
+		state.checkpoint = Records.Checkpoint(output + ".checkpoint", {})
+		state.checkpoint.open(False)
+		state.writer = Records.RecordWriter(output)
+		state.running = True
+
+		tasks = [asyncio.create_task(ServerScanner.scanner_task(47, arguments.timeout)) for _ in range(arguments.runners)]
+		await ServerScanner.manual_scan(argparse.Namespace(
+			target="127.0.0.1", ports=list(map(str, ports)), ping_scan=False,
+			randomize_hosts=False, randomize_ports=False
+		))
+
+		state.running = False
+		for task in tasks:
+			task.cancel()
+
+		state.checkpoint.close()
+		state.writer.close()
+
+	return len(ports)
+
+
+async def run_pipeline(name, arguments, ports):
+	latencies = []
+	failures = []
+
+	with timed_status(latencies, failures), Benchmark.Measurement() as measurement:
+		probes = await (name == "tracker" and run_tracker or run_scanner)(arguments, ports)
+
+	return {
+		"probes": probes,
+		"probes_per_second": probes / measurement.wall_time,
+		"failures": len(failures),
+		"latency": Benchmark.summarize(latencies),
+		**measurement.get_dict(),
+	}
+
+
+def main():
+	arguments = parse_arguments()
+
+	config = FakeServer.FakeServerConfig(
+		online=arguments.online, sample=arguments.sample, mods=arguments.mods, mod_format=arguments.mod_format,
+		favicon_size=arguments.favicon_size, latency=arguments.latency, jitter=arguments.jitter,
+		failure_rate=arguments.failure_rate, timeout_rate=arguments.timeout_rate
+	)
+
+	# The fake servers live in their own process so they don't show up in the measurements
+	[connection, child_connection] = multiprocessing.Pipe()
+	process = multiprocessing.Process(
+		target=FakeServer.serve, args=(config, arguments.servers, arguments.base_port, child_connection), daemon=True
+	)
+	process.start()
+	ports = connection.recv()
+
+	report = {"environment": Benchmark.environment(), "settings": vars(arguments).copy()}
+	for name in arguments.pipeline:
+		report[name] = asyncio.run(run_pipeline(name, arguments, ports))
+
+	connection.send(None)
+	report["fake_server"] = connection.recv()
+	process.join()
+
+	Benchmark.write_report(report, arguments.report)
+
+	if arguments.save_baseline:
+		Benchmark.save_baseline(report, f"{c_baseline_dir}/{arguments.save_baseline}.json")
+
+	if arguments.compare:
+		Benchmark.print_comparison(report, f"{c_baseline_dir}/{arguments.compare}.json")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,151 @@
+import argparse
+import asyncio
+import time
+
+from Modules import DataStructure
+from Modules import Benchmark
+from Modules import Scheduler
+from Modules import Records
+from Modules import Replay
+
+c_baseline_dir = "Benchmarks/baselines"
+c_runners = 16
+c_repeat = 3
+
+
+def parse_arguments():
+	parser = argparse.ArgumentParser(description="Replays a status capture through parse_status and the tracker's worker pool")
+
+	parser.add_argument(
+		"capture", help="The capture to replay (written by \"ServerTracker.py --capture\" or \"Benchmarks.pipeline --capture\").", type=str
+	)
+
+	parser.add_argument(
+		"--speed", help="Replay speed relative to the capture, 0 replays as fast as possible (defaults to 0).", required=False, type=float,
+		default=0
+	)
+
+	parser.add_argument(
+		"--runners", "-r", help=f"Task count of the worker pool (defaults to {c_runners}).", required=False, type=int,
+		default=c_runners
+	)
+
+	parser.add_argument(
+		"--repeat", help=f"How many times the parse pass is timed, the best time is kept (defaults to {c_repeat}).", required=False, type=int,
+		default=c_repeat
+	)
+
+	parser.add_argument(
+		"--report", "-o", help="Write the JSON report to this file instead of stdout.", required=False, type=str,
+		default=None
+	)
+
+	parser.add_argument(
+		"--save-baseline", help=f"Store the report as a named baseline in \"{c_baseline_dir}\".", required=False, type=str,
+		default=None
+	)
+
+	parser.add_argument(
+		"--compare", help="Compare the report against a named baseline.", required=False, type=str,
+		default=None
+	)
+
+	return parser.parse_args()
+
+
+def replay_parse(records):
+	# parse_status alone, on a fresh state so every pass does the same work
+	host_list = DataStructure.HostList()
+	servers = [host_list.get_or_add_server(record["address"], record["port"]) for record in records]
+	samples = []
+
+	start = time.perf_counter()
+	for server, record in zip(servers, records):
+		before = time.perf_counter()
+		Replay.apply(server, record)
+		samples.append(time.perf_counter() - before)
+
+	return time.perf_counter() - start, samples, host_list
+
+
+async def replay_pipeline(arguments, records):
+	host_list = DataStructure.HostList()
+	latencies = []
+
+	async def handler(item):
+		[server, record, queued] = item
+		Replay.apply(server, record)
+		latencies.append(time.perf_counter() - queued)
+
+	pool = Scheduler.WorkerPool(
+		handler, Scheduler.FairQueue(lambda item: item[0].host.address, arguments.runners),
+		arguments.runners, arguments.runners, arguments.runners * 2, arguments.runners
+	)
+	task = asyncio.create_task(pool.run())
+
+	async for record in Replay.play(records, arguments.speed):
+		server = host_list.get_or_add_server(record["address"], record["port"])
+		await pool.put((server, record, time.perf_counter()))
+
+	while pool.processed < len(records):
+		await asyncio.sleep(0.001)
+
+	pool.stop()
+	task.cancel()
+
+	return latencies, host_list
+
+
+def main():
+	arguments = parse_arguments()
+
+	start = time.perf_counter()
+	records = list(Records.read_records(arguments.capture))
+	load_time = time.perf_counter() - start
+
+	report = {
+		"environment": Benchmark.environment(),
+		"settings": vars(arguments).copy(),
+		"capture": {
+			"records": len(records),
+			"failures": sum(1 for record in records if not record["status"]),
+			"servers": len({(record["address"], record["port"]) for record in records}),
+			"duration": records and records[-1]["time"] - records[0]["time"] or 0,
+			"load_time": load_time,
+		},
+	}
+
+	best = None
+	for _ in range(arguments.repeat):
+		result = replay_parse(records)
+		best = best == None and result or min(best, result, key=lambda entry: entry[0])
+
+	[seconds, samples, host_list] = best
+	report["parse"] = {
+		"seconds": seconds,
+		"records_per_second": seconds and len(records) / seconds,
+		"per_record": Benchmark.summarize(samples),
+		"servers": host_list.server_count(),
+		"active": sum(1 for server in host_list.server_iterator() if server.active),
+	}
+
+	with Benchmark.Measurement() as measurement:
+		[latencies, host_list] = asyncio.run(replay_pipeline(arguments, records))
+
+	report["pipeline"] = {
+		"records_per_second": len(records) / measurement.wall_time,
+		"latency": Benchmark.summarize(latencies),
+		**measurement.get_dict(),
+	}
+
+	Benchmark.write_report(report, arguments.report)
+
+	if arguments.save_baseline:
+		Benchmark.save_baseline(report, f"{c_baseline_dir}/{arguments.save_baseline}.json")
+
+	if arguments.compare:
+		Benchmark.print_comparison(report, f"{c_baseline_dir}/{arguments.compare}.json")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,213 @@
+import multiprocessing
+import argparse
+import tempfile
+import pathlib
+import time
+import sys
+import os
+
+from Modules import DataStructure
+from Modules import FakeServer
+from Modules import Benchmark
+from Modules import Sharding
+
+import ServerTracker
+
+c_baseline_dir = "Benchmarks/baselines"
+c_shards = [1, 2, 4]
+c_hosts = 64
+c_ports_per_host = 32
+c_server_processes = 4
+c_duration = 10
+c_warmup = 2
+c_runners = 64
+c_host_limit = 8
+
+
+def parse_arguments():
+	parser = argparse.ArgumentParser(description="Measures how the tracker's probe rate scales with the amount of shard processes")
+
+	parser.add_argument(
+		"--shards", "-s", help=f"Shard counts to measure (defaults to {' '.join(map(str, c_shards))}).", nargs='+', required=False, type=int,
+		default=c_shards
+	)
+
+	parser.add_argument(
+		"--hosts", help=f"Amount of fake hosts, each gets its own 127.0.0.X address (defaults to {c_hosts}).", required=False, type=int,
+		default=c_hosts
+	)
+
+	parser.add_argument(
+		"--ports-per-host", help=f"Fake servers per host (defaults to {c_ports_per_host}).", required=False, type=int,
+		default=c_ports_per_host
+	)
+
+	parser.add_argument(
+		"--server-processes", help=f"Processes the fake hosts are split between (defaults to {c_server_processes}).", required=False, type=int,
+		default=c_server_processes
+	)
+
+	parser.add_argument(
+		"--duration", "-d", help=f"Seconds measured per shard count (defaults to {c_duration}).", required=False, type=float,
+		default=c_duration
+	)
+
+	parser.add_argument(
+		"--warmup", help=f"Seconds every shard gets to load its state and start probing before the measurement (defaults to {c_warmup}).", required=False, type=float,
+		default=c_warmup
+	)
+
+	parser.add_argument(
+		"--runners", "-r", help=f"Task count per shard (defaults to {c_runners}).", required=False, type=int,
+		default=c_runners
+	)
+
+	parser.add_argument(
+		"--host-limit", help=f"Simultaneous status requests per host (defaults to {c_host_limit}).", required=False, type=int,
+		default=c_host_limit
+	)
+
+	parser.add_argument("--online", help="Online players per server.", required=False, type=int, default=20)
+	parser.add_argument("--sample", help="Player sample size per server, sampled players get premium checks against the Mojang API.", required=False, type=int, default=0)
+	parser.add_argument("--latency", help="Server side latency in seconds.", required=False, type=float, default=0)
+
+	parser.add_argument(
+		"--report", "-o", help="Write the JSON report to this file instead of stdout.", required=False, type=str,
+		default=None
+	)
+
+	parser.add_argument(
+		"--save-baseline", help=f"Store the report as a named baseline in \"{c_baseline_dir}\".", required=False, type=str,
+		default=None
+	)
+
+	parser.add_argument(
+		"--compare", help="Compare the report against a named baseline.", required=False, type=str,
+		default=None
+	)
+
+	return parser.parse_args()
+
+
+def start_servers(arguments, config):
+	# The fake servers live in their own processes so they don't compete with the shards for a single core
+	hosts = [f"127.0.0.{idx + 1}" for idx in range(arguments.hosts)]
+	groups = [hosts[idx::arguments.server_processes] for idx in range(arguments.server_processes)]
+	servers = []
+	ports = []
+
+	for group in filter(None, groups):
+		[connection, child_connection] = multiprocessing.Pipe()
+		process = multiprocessing.Process(
+			target=FakeServer.serve, args=(config, arguments.ports_per_host, 0, child_connection, group), daemon=True
+		)
+		process.start()
+
+		servers.append((process, connection))
+		ports.extend(connection.recv())
+
+	return servers, ports
+
+
+def stop_servers(servers):
+	stats = {}
+
+	for process, connection in servers:
+		connection.send(None)
+		for key, value in connection.recv().items():
+			stats[key] = stats.get(key, 0) + value
+
+		process.join()
+
+	return stats
+
+
+def processed(coordinator):
+	return sum(stats["pool"]["processed"] for stats in coordinator.shard_stats.values())
+
+
+def wait(coordinator, seconds):
+	end = time.perf_counter() + seconds
+
+	while time.perf_counter() < end:
+		coordinator.poll()
+		time.sleep(0.05)
+
+
+def run_shards(arguments, ports, shards):
+	with tempfile.TemporaryDirectory() as directory:
+		state_file = str(pathlib.Path(directory) / "state.pickle")
+
+		host_list = DataStructure.HostList()
+		for host, host_ports in ports:
+			for port in host_ports:
+				host_list.get_or_add_server(host, port)
+
+		host_list.serialize_file(state_file)
+
+		tracker_arguments = ServerTracker.parse_arguments([
+			"--state-file", state_file, "--runners", str(arguments.runners), "--min-runners", str(arguments.runners),
+			"--max-runners", str(arguments.runners), "--max-sockets", str(arguments.runners * 2),
+			"--host-limit", str(arguments.host_limit), "--scan-wait", "0"
+		])
+
+		coordinator = Sharding.Coordinator(ServerTracker.shard_worker, tracker_arguments, shards)
+		coordinator.start()
+
+		while len(coordinator.shard_stats) < shards:
+			wait(coordinator, 0.1)
+
+		wait(coordinator, arguments.warmup)
+
+		start = time.perf_counter()
+		before = processed(coordinator)
+		wait(coordinator, arguments.duration)
+		elapsed = time.perf_counter() - start
+		probes = processed(coordinator) - before
+
+		coordinator.stop()
+
+		return {
+			"shards": shards,
+			"probes": probes,
+			"probes_per_second": probes / elapsed,
+			"servers": len(coordinator.summaries),
+			"online": coordinator.totals()["online"],
+		}
+
+
+def main():
+	arguments = parse_arguments()
+
+	config = FakeServer.FakeServerConfig(online=arguments.online, sample=arguments.sample, latency=arguments.latency)
+	[servers, ports] = start_servers(arguments, config)
+
+	# Past the core count the shards (and the fake servers) share cores, the rate stops scaling because of the machine and not the tracker
+	cpu_count = os.cpu_count() or 1
+	for shards in arguments.shards:
+		if shards > cpu_count:
+			print(f"Warning: {shards} shards on {cpu_count} CPUs, that measurement is oversubscribed", file=sys.stderr)
+
+	report = {"environment": {**Benchmark.environment(), "cpu_count": os.cpu_count()}, "settings": vars(arguments).copy()}
+	results = [run_shards(arguments, ports, shards) for shards in arguments.shards]
+
+	# Efficiency is the rate per shard relative to the smallest shard count measured
+	base = next(result for result in results if result["shards"] == min(arguments.shards))
+	for result in results:
+		result["speedup"] = result["probes_per_second"] / max(base["probes_per_second"], 1e-9)
+		result["efficiency"] = result["speedup"] * base["shards"] / result["shards"]
+
+	report["sharding"] = {str(result["shards"]): result for result in results}
+	report["fake_server"] = stop_servers(servers)
+
+	Benchmark.write_report(report, arguments.report)
+
+	if arguments.save_baseline:
+		Benchmark.save_baseline(report, f"{c_baseline_dir}/{arguments.save_baseline}.json")
+
+	if arguments.compare:
+		Benchmark.print_comparison(report, f"{c_baseline_dir}/{arguments.compare}.json")
+
+
+if __name__ == "__main__":
+	main()
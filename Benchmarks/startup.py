@@ -0,0 +1,152 @@
+import subprocess
+import argparse
+import pathlib
+import json
+import sys
+
+from Modules import Benchmark
+
+c_baseline_dir = "Benchmarks/baselines"
+c_budget_file = "Benchmarks/startup_budget.json"
+c_repeat = 5
+c_top = 5
+
+
+def parse_arguments():
+	parser = argparse.ArgumentParser(description="Measures the cold import time of every entry point against the checked in budget")
+
+	parser.add_argument(
+		"--entry-points", "-e", help="Entry points to measure (defaults to every entry point in the budget file).", nargs='+', required=False, type=str,
+		default=None
+	)
+
+	parser.add_argument(
+		"--repeat", "-r", help=f"How many fresh interpreters are started per entry point, the best time is kept (defaults to {c_repeat}).", required=False, type=int,
+		default=c_repeat
+	)
+
+	parser.add_argument(
+		"--top", "-n", help=f"How many of the slowest imported modules to list per entry point (defaults to {c_top}).", required=False, type=int,
+		default=c_top
+	)
+
+	parser.add_argument(
+		"--budget", help=f"Budget file with the target import time of each entry point (defaults to \"{c_budget_file}\").", required=False, type=str,
+		default=c_budget_file
+	)
+
+	parser.add_argument(
+		"--check", help="Exit with an error if an entry point goes over its budget.", required=False, action="store_true",
+		default=False
+	)
+
+	parser.add_argument(
+		"--report", "-o", help="Write the JSON report to this file instead of stdout.", required=False, type=str,
+		default=None
+	)
+
+	parser.add_argument(
+		"--save-baseline", help=f"Store the report as a named baseline in \"{c_baseline_dir}\".", required=False, type=str,
+		default=None
+	)
+
+	parser.add_argument(
+		"--compare", help="Compare the report against a named baseline.", required=False, type=str,
+		default=None
+	)
+
+	return parser.parse_args()
+
+
+def parse_importtime(output):
+	# Lines look like "import time:  self [us] | cumulative | imported package", nested imports are indented
+	modules = []
+
+	for line in output.splitlines():
+		if not line.startswith("import time:"):
+			continue
+
+		[self_time, cumulative, name] = line[len("import time:"):].split('|')
+		if not self_time.strip().isdigit():
+			continue
+
+		modules.append((name.strip(), int(self_time) / 1e6, int(cumulative) / 1e6))
+
+	return modules
+
+
+def measure_import(module):
+	process = subprocess.run(
+		[sys.executable, "-X", "importtime", "-c", f"import {module}"],
+		capture_output=True, text=True
+	)
+
+	modules = parse_importtime(process.stderr)
+	total = next((cumulative for name, _, cumulative in modules if name == module), None)
+
+	return {
+		"import_time": total,
+		"modules": modules,
+		"error": process.returncode != 0 and process.stderr.strip().splitlines()[-1] or None,
+	}
+
+
+def benchmark_entry_point(module, arguments, budget):
+	best = None
+
+	for _ in range(arguments.repeat):
+		result = measure_import(module)
+
+		if result["error"]:
+			return {"error": result["error"], "budget": budget}
+
+		if best == None or result["import_time"] < best["import_time"]:
+			best = result
+
+	slowest = sorted(best["modules"], key=lambda entry: entry[1], reverse=True)[:arguments.top]
+
+	return {
+		"import_time": best["import_time"],
+		"budget": budget,
+		"within_budget": budget == None or best["import_time"] <= budget,
+		"module_count": len(best["modules"]),
+		"slowest_modules": {name: self_time for name, self_time, _ in slowest},
+	}
+
+
+def main():
+	arguments = parse_arguments()
+	budgets = json.loads(pathlib.Path(arguments.budget).read_text())
+	entry_points = arguments.entry_points or list(budgets)
+
+	report = {"environment": Benchmark.environment(), "settings": vars(arguments).copy()}
+
+	# The interpreter's own startup is measured once so entry points can be compared to it
+	report["interpreter"] = benchmark_entry_point("site", arguments, None)
+
+	for module in entry_points:
+		report[module] = benchmark_entry_point(module, arguments, budgets.get(module))
+
+	Benchmark.write_report(report, arguments.report)
+
+	if arguments.save_baseline:
+		Benchmark.save_baseline(report, f"{c_baseline_dir}/{arguments.save_baseline}.json")
+
+	if arguments.compare:
+		Benchmark.print_comparison(report, f"{c_baseline_dir}/{arguments.compare}.json")
+
+	failed = [module for module in entry_points if not report[module].get("within_budget", False)]
+	for module in failed:
+		result = report[module]
+
+		if result.get("error"):
+			print(f"{module}: {result['error']}", file=sys.stderr)
+		else:
+			print(f"{module}: {result['import_time'] * 1000:0.1f}ms over the {result['budget'] * 1000:0.1f}ms budget", file=sys.stderr)
+
+	if arguments.check and failed:
+		sys.exit(1)
+
+
+if __name__ == "__main__":
+	main()
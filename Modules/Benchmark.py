@@ -0,0 +1,110 @@
+import platform
+import pathlib
+import json
+import time
+import sys
+
+try:
+	import resource
+except ImportError:
+	resource = None # Windows
+
+
+def percentile(samples, fraction):
+	if not samples:
+		return None
+
+	ordered = sorted(samples)
+	return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(samples):
+	if not samples:
+		return {"count": 0}
+
+	return {
+		"count": len(samples),
+		"min": min(samples),
+		"p50": percentile(samples, 0.50),
+		"p99": percentile(samples, 0.99),
+		"max": max(samples),
+		"mean": sum(samples) / len(samples),
+	}
+
+
+def peak_memory():
+	if not resource:
+		return None
+
+	peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	return sys.platform == "darwin" and peak or peak * 1024 # Linux reports KiB, macOS bytes
+
+
+class Measurement:
+	def __init__(self):
+		self.wall_time = 0
+		self.cpu_time = 0
+		self.peak_memory = None
+
+	def __enter__(self):
+		self._wall = time.perf_counter()
+		self._cpu = time.process_time()
+		return self
+
+	def __exit__(self, *_):
+		self.wall_time = time.perf_counter() - self._wall
+		self.cpu_time = time.process_time() - self._cpu
+		self.peak_memory = peak_memory()
+
+	def get_dict(self):
+		return {
+			"wall_time": self.wall_time,
+			"cpu_time": self.cpu_time,
+			"cpu_percent": self.wall_time and self.cpu_time / self.wall_time * 100,
+			"peak_memory": self.peak_memory,
+		}
+
+
+def environment():
+	return {
+		"python": platform.python_version(),
+		"implementation": platform.python_implementation(),
+		"platform": platform.platform(),
+		"time": time.time(),
+	}
+
+
+def write_report(report, filename=None):
+	text = json.dumps(report, indent=3)
+
+	if filename:
+		pathlib.Path(filename).write_text(text)
+	else:
+		print(text)
+
+
+def save_baseline(report, filename):
+	path = pathlib.Path(filename)
+	path.parent.mkdir(parents=True, exist_ok=True)
+	path.write_text(json.dumps(report, indent=3))
+
+
+def compare(report, baseline, prefix=""):
+	# Yields (key, baseline value, current value, relative change) for every numeric field both reports share
+	for key, value in report.items():
+		previous = baseline.get(key) if isinstance(baseline, dict) else None
+
+		if isinstance(value, dict):
+			yield from compare(value, previous or {}, prefix + key + '.')
+		elif isinstance(value, (int, float)) and isinstance(previous, (int, float)) and not isinstance(value, bool):
+			yield prefix + key, previous, value, previous and (value - previous) / previous
+
+
+def print_comparison(report, baseline_file):
+	baseline = json.loads(pathlib.Path(baseline_file).read_text())
+
+	for key, previous, current, change in compare(report, baseline):
+		if key.split('.')[0] in ["environment", "settings"]:
+			continue
+
+		print(f"{key:<48} {previous:>14.6g} -> {current:>14.6g} ({change * 100:+0.1f}%)")
@@ -0,0 +1,169 @@
+import importlib.util
+import pathlib
+
+from Modules import Records
+
+# pyarrow and numpy are both optional, they're imported by the writer that needs them
+
+c_batch_size = 65536 # Rows per batch (and parquet row group)
+c_formats = ["parquet", "arrow", "npz"]
+c_extensions = {"parquet": ".parquet", "arrow": ".arrow", "npz": ".npz"}
+
+# Players and mods point at their server's row in the servers table, history rows come from record files and are joined on address and port
+c_tables = {
+	"servers": [
+		("address", "string"), ("port", "int32"), ("version", "string"), ("protocol", "int32"), ("active", "bool"),
+		("active_players", "int32"), ("max_players", "int32"), ("players_seen", "int32"), ("mod_count", "int32"),
+		("play_time", "float64"), ("secure_chat", "bool"), ("favicon_crc32", "int64"), ("last_update", "float64"),
+	],
+	"players": [
+		("server", "int64"), ("name", "string"), ("uuid", "string"), ("active", "bool"), ("play_time", "float64"),
+		("last_seen", "float64"), ("last_verified", "float64"), ("premium_name", "bool"), ("premium_uuid", "bool"),
+	],
+	"mods": [
+		("server", "int64"), ("id", "string"), ("version", "string"),
+	],
+	"history": [
+		("address", "string"), ("port", "int32"), ("time", "float64"), ("active", "bool"), ("active_players", "int32"), ("max_players", "int32"),
+	],
+}
+
+# NumPy has no missing values, these stand in for None
+c_fill_values = {"string": "", "bool": False, "int32": -1, "int64": -1, "float64": float("nan")}
+
+
+def default_format():
+	return importlib.util.find_spec("pyarrow") and "parquet" or "npz"
+
+
+class ArrowWriter:
+	def __init__(self, filename, table, file_format):
+		import pyarrow
+
+		self.pyarrow = pyarrow
+		self.schema = pyarrow.schema([(name, getattr(pyarrow, kind == "bool" and "bool_" or kind)()) for name, kind in c_tables[table]])
+
+		if file_format == "parquet":
+			import pyarrow.parquet
+
+			self.writer = pyarrow.parquet.ParquetWriter(filename, self.schema)
+		else:
+			import pyarrow.ipc
+
+			self.writer = pyarrow.ipc.new_file(filename, self.schema)
+
+	def write(self, columns):
+		self.writer.write_batch(self.pyarrow.record_batch(columns, schema=self.schema))
+
+	def close(self):
+		self.writer.close()
+
+
+class NumpyWriter:
+	# npz can't be appended to, every batch is converted right away so only the arrays are kept until close
+	def __init__(self, filename, table):
+		import numpy
+
+		self.numpy = numpy
+		self.filename = filename
+		self.fields = c_tables[table]
+		self.batches = {name: [] for name, _ in self.fields}
+
+	def write(self, columns):
+		numpy = self.numpy
+
+		for [name, kind], values in zip(self.fields, columns):
+			fill = c_fill_values[kind]
+			values = [fill if value == None else value for value in values]
+
+			self.batches[name].append(numpy.array(values, dtype=kind == "string" and str or kind))
+
+	def close(self):
+		numpy = self.numpy
+		arrays = {}
+
+		for name, kind in self.fields:
+			batches = self.batches[name] or [numpy.array([], dtype=kind == "string" and str or kind)]
+			arrays[name] = numpy.concatenate(batches)
+
+		# Uncompressed so reading a column doesn't inflate it, numpy.load still reads each column whole since npz members can't be memory-mapped
+		numpy.savez(self.filename, **arrays)
+
+
+class TableWriter:
+	def __init__(self, directory, table, file_format, batch_size=c_batch_size):
+		filename = str(pathlib.Path(directory) / (table + c_extensions[file_format]))
+
+		self.writer = file_format == "npz" and NumpyWriter(filename, table) or ArrowWriter(filename, table, file_format)
+		self.batch_size = batch_size
+		self.rows = []
+		self.count = 0
+
+	def append(self, row):
+		self.rows.append(row)
+
+		if len(self.rows) >= self.batch_size:
+			self.flush()
+
+	def flush(self):
+		if self.rows:
+			self.writer.write([list(column) for column in zip(*self.rows)])
+			self.count += len(self.rows)
+			self.rows = []
+
+	def close(self):
+		self.flush()
+		self.writer.close()
+
+
+class Exporter:
+	def __init__(self, directory, file_format=None, batch_size=c_batch_size):
+		file_format = file_format or default_format()
+		assert file_format in c_formats, f"Unknown format \"{file_format}\""
+
+		pathlib.Path(directory).mkdir(parents=True, exist_ok=True)
+
+		self.format = file_format
+		self.tables = {table: TableWriter(directory, table, file_format, batch_size) for table in c_tables}
+
+	def add_host_list(self, host_list):
+		# Can be called once per state file (shards), server rows keep counting up
+		servers = self.tables["servers"]
+		players = self.tables["players"]
+		mods = self.tables["mods"]
+
+		for server in host_list.server_iterator():
+			row = servers.count + len(servers.rows)
+
+			servers.append((
+				server.host.address, server.port, server.server_version, server.protocol_version, server.active,
+				server.active_players, server.max_players, len(server.players), len(server.mods),
+				server.get_play_time(), server.secure_chat, server.favicon.crc32, server.last_update,
+			))
+
+			for player in server.players:
+				players.append((
+					row, player.name, player.uuid, player.active, player.play_time,
+					player.last_seen, player.last_verified, player.premium_name, player.premium_uuid,
+				))
+
+			for mod in server.mods:
+				mods.append((row, mod.id, mod.version))
+
+	def add_records(self, filename):
+		history = self.tables["history"]
+
+		for record in Records.read_records(filename):
+			status = record["status"]
+			players = status and status.get("players") or {}
+
+			history.append((
+				record["address"], record["port"], record["time"], bool(status),
+				players.get("online", 0), players.get("max", 0),
+			))
+
+	def close(self):
+		for table in self.tables.values():
+			table.close()
+
+		return {name: table.count for name, table in self.tables.items()}
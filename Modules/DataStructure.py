@@ -1,13 +1,11 @@
-import requests
-import aiohttp.client_exceptions
-import aiohttp
-import asyncio
 import base64
 import pickle
 import zlib
 import time
 
-from datauri import DataURI
+from Modules import StateIndex
+from Modules import Records
+from Modules import Events
 
 
 def get_dict(item):
@@ -23,21 +21,207 @@ def get_dict(item):
 		return item
 
 
+class ServerIndex:
+	empty_keys = (None, frozenset(), frozenset(), None, False)
+
+	def __init__(self):
+		self.keys = {}
+		self.versions = {}
+		self.mods = {}
+		self.tags = {}
+		self.players = {}
+		self.online = set()
+
+	@staticmethod
+	def _server_keys(server):
+		return (
+			server.server_version,
+			frozenset(mod.id for mod in server.mods),
+			frozenset(server.tags),
+			server.active_players,
+			server.active
+		)
+
+	@staticmethod
+	def _move(index, server, old_keys, new_keys):
+		for key in old_keys - new_keys:
+			bucket = index[key]
+			bucket.discard(server)
+			if not bucket:
+				del index[key]
+
+		for key in new_keys - old_keys:
+			index.setdefault(key, set()).add(server)
+
+	def _apply(self, server, old, new):
+		move = self._move
+		move(self.versions, server, {old[0]} - {None}, {new[0]} - {None})
+		move(self.mods, server, old[1], new[1])
+		move(self.tags, server, old[2], new[2])
+		move(self.players, server, {old[3]} - {None}, {new[3]} - {None})
+
+		if new[4]:
+			self.online.add(server)
+		else:
+			self.online.discard(server)
+
+	def update(self, server):
+		old = self.keys.get(server, self.empty_keys)
+		new = self._server_keys(server)
+
+		if old != new:
+			self.keys[server] = new
+			self._apply(server, old, new)
+
+	def remove(self, server):
+		old = self.keys.pop(server, None)
+
+		if old:
+			self._apply(server, old, self.empty_keys)
+
+	def rebuild(self, servers):
+		self.__init__()
+		for server in servers:
+			self.update(server)
+
+	@staticmethod
+	def _match(index, text):
+		text = text.lower()
+		result = set()
+		for key, bucket in index.items():
+			if text in str(key).lower():
+				result |= bucket
+		
+		return result
+
+	def query(self, version=None, mod=None, tag=None, online=None, players=None):
+		candidates = []
+
+		if version != None:
+			candidates.append(self._match(self.versions, version))
+		
+		if mod != None:
+			candidates.append(self._match(self.mods, mod))
+		
+		if tag != None:
+			candidates.append(self._match(self.tags, tag))
+		
+		if players != None:
+			[lower, upper] = players
+			result = set()
+			for count, bucket in self.players.items():
+				if (lower == None or count >= lower) and (upper == None or count <= upper):
+					result |= bucket
+			candidates.append(result)
+
+		if online == True:
+			candidates.append(self.online)
+		
+		if not candidates:
+			if online == False:
+				return set(self.keys) - self.online
+			return None
+		
+		candidates.sort(key=len)
+		result = set(candidates[0])
+		for candidate in candidates[1:]:
+			result &= candidate
+		
+		if online == False:
+			result -= self.online
+		
+		return result
+
+
+class Rollup:
+	# Per host and global totals, kept up to date from each server's contribution like ServerIndex does with its keys
+	fields = ("servers", "online", "active_players", "players_seen", "play_time", "mods")
+
+	def __init__(self):
+		self.contributions = {}
+		self.hosts = {}
+		self.totals = [0] * len(self.fields)
+
+	@staticmethod
+	def _contribution(server):
+		return (1, server.active and 1 or 0, server.active_players, len(server.players), server.total_play_time, len(server.mods))
+
+	def _apply(self, address, old, new):
+		host_totals = self.hosts.setdefault(address, [0] * len(self.fields))
+		totals = self.totals
+
+		for idx, [before, after] in enumerate(zip(old, new)):
+			delta = after - before
+			host_totals[idx] += delta
+			totals[idx] += delta
+
+		if not host_totals[0]:
+			del self.hosts[address]
+
+	def update(self, server):
+		old = self.contributions.get(server, (0,) * len(self.fields))
+		new = self._contribution(server)
+
+		if old != new:
+			self.contributions[server] = new
+			self._apply(server.host.address, old, new)
+
+	def remove(self, server):
+		old = self.contributions.pop(server, None)
+
+		if old:
+			self._apply(server.host.address, old, (0,) * len(self.fields))
+
+	def rebuild(self, servers):
+		self.__init__()
+		for server in servers:
+			self.update(server)
+
+	def get(self, address=None):
+		totals = address == None and self.totals or self.hosts.get(address, (0,) * len(self.fields))
+		return dict(zip(self.fields, totals))
+
+
 class HostList:
 	def __init__(self):
 		self.hosts = []
+		self.host_map = {}
+		self.index = ServerIndex()
+		self.rollup = Rollup()
+		self.events = Events.EventBus()
+
+	def __getstate__(self):
+		return {key: value for key, value in self.__dict__.items() if key not in ["index", "rollup", "host_map", "events"]}
+
+	def __setstate__(self, state):
+		self.__dict__.update(state)
+		self.host_map = {host.address: host for host in self.hosts}
+		self.index = ServerIndex()
+		self.rollup = Rollup()
+		self.events = Events.EventBus()
+
+	def get_host(self, address):
+		return self.host_map.get(address)
 
 	def get_or_add_host(self, address):
-		host = next((host for host in self.hosts if host.address == address), None)
+		host = self.host_map.get(address)
 
 		if not host:
-			host = Host(address)
+			host = Host(address, self)
 			self.hosts.append(host)
+			self.host_map[address] = host
 		
 		return host
 	
 	def get_or_add_server(self, address, port):
 		return self.get_or_add_host(address).get_or_add_server(port)
+
+	def remove_host(self, address):
+		host = self.host_map.pop(address)
+		self.hosts.remove(host)
+
+		for server in list(host.servers):
+			host.remove_server(server.port)
 	
 	def server_iterator(self):
 		for host in self.hosts:
@@ -52,33 +236,161 @@ class HostList:
 
 		return server_count
 	
-	def serialize_file(self, filename):
+	def serialize_file(self, filename, index=True):
 		with open(filename, "wb") as file:
 			pickle.dump(self, file)
+		
+		if index:
+			StateIndex.write(filename, self)
 	
 	def deserialize_file(self, filename):
 		with open(filename, "rb") as file:
 			self.hosts = pickle.load(file).hosts
 
+		self.host_map = {}
+		for host in self.hosts:
+			host.host_list = self
+			self.host_map[host.address] = host
+
+			for server in host.servers:
+				g_intern_pool.intern_server(server)
+				server.recount()
+		
+		self.index.rebuild(self.server_iterator())
+		self.rollup.rebuild(self.server_iterator())
+
+	def deserialize_records(self, filename):
+		for record in Records.read_records(filename):
+			if record["status"]:
+				self.get_or_add_server(record["address"], record["port"]).parse_status(record["status"], record["time"])
+				continue
+
+			# Captures also record failed requests, those only matter for servers that are already known
+			host = self.get_host(record["address"])
+			server = host and host.get_server(record["port"])
+			if server:
+				server.set_inactive()
+
+	def merge(self, other):
+		# Moves every server of other into this list, other shouldn't be used afterwards
+		counts = {"added": 0, "updated": 0, "unchanged": 0}
+
+		for other_host in other.hosts:
+			host = self.get_or_add_host(other_host.address)
+
+			for other_server in other_host.servers:
+				server = host.get_server(other_server.port)
+				before = server and Events.snapshot(server)
+
+				if not server:
+					host.add_server(other_server)
+					counts["added"] += 1
+				elif server.merge(other_server):
+					host.changed(server, before)
+					counts["updated"] += 1
+				else:
+					counts["unchanged"] += 1
+		
+		return counts
+
+	def diff(self, other):
+		# Joins both lists by (address, port) and yields a change record for every server that differs, other is the newer state
+		counts = {"added": 0, "removed": 0, "changed": 0, "unchanged": 0}
+
+		for host in self.hosts:
+			other_host = other.get_host(host.address)
+
+			for server in host.servers:
+				other_server = other_host and other_host.get_server(server.port)
+
+				if not other_server:
+					counts["removed"] += 1
+					yield {"change": "removed", **server.get_summary()}
+					continue
+
+				changes = server.diff(other_server)
+				if changes:
+					counts["changed"] += 1
+					yield {"change": "changed", "address": host.address, "port": server.port, "fields": changes}
+				else:
+					counts["unchanged"] += 1
+
+		for other_host in other.hosts:
+			host = self.get_host(other_host.address)
+
+			for other_server in other_host.servers:
+				if not (host and host.get_server(other_server.port)):
+					counts["added"] += 1
+					yield {"change": "added", **other_server.get_summary()}
+
+		yield {
+			"change": "summary",
+			**counts,
+			"hosts": [len(self.hosts), len(other.hosts)],
+			"servers": [self.server_count(), other.server_count()],
+			"players": [sum(len(server.players) for server in hosts.server_iterator()) for hosts in [self, other]],
+		}
+
+	def get_dict(self):
+		return {"hosts": self.hosts}
+
 class Host:
-	def __init__(self, address=None):
+	def __init__(self, address=None, host_list=None):
+		self.host_list = host_list
 		self.address = address
 		self.servers = []
+		self.server_map = {}
+
+	def __getstate__(self):
+		return {key: value for key, value in self.__dict__.items() if key != "server_map"}
+
+	def __setstate__(self, state):
+		self.__dict__.update(state)
+		self.server_map = {server.port: server for server in self.servers}
 
 	def get_server(self, port):
-		return next((server for server in self.servers if server.port == port), None)
+		return self.server_map.get(port)
+
+	def add_server(self, server):
+		server.host = self
+		self.servers.append(server)
+		self.server_map[server.port] = server
+		self.reindex(server)
 
 	def get_or_add_server(self, port):
 		server = self.get_server(port)
 		
 		if not server:
 			server = Server(self, port)
-			self.servers.append(server)
+			self.add_server(server)
 		
 		return server
 	
 	def remove_server(self, port):
-		self.servers.remove(self.get_server(port))
+		server = self.server_map.pop(port)
+		self.servers.remove(server)
+
+		if self.host_list:
+			self.host_list.index.remove(server)
+			self.host_list.rollup.remove(server)
+			self.host_list.events.emit(Events.ServerRemoved(server, (self.address, port)))
+
+	def reindex(self, server):
+		if self.host_list:
+			self.host_list.index.update(server)
+			self.host_list.rollup.update(server)
+
+	def changed(self, server, before):
+		if self.host_list:
+			self.host_list.index.update(server)
+			self.host_list.rollup.update(server)
+
+			events = self.host_list.events
+			for event in Events.diff(server, before, Events.snapshot(server)):
+				events.emit(event)
+
+	def get_dict(self):
+		return {"address": self.address, "servers": self.servers}
 
 class Favicon:
 	def __init__(self):
@@ -88,6 +400,8 @@ class Favicon:
 		self.data = None
 
 	def load_multipart(self, multipart):
+		from datauri import DataURI
+
 		uri = DataURI(multipart)
 		self.crc32 = zlib.crc32(uri.data)
 		self.size = len(uri.data)
@@ -95,13 +409,17 @@ class Favicon:
 		self.data = uri.data
 
 class Server:
+	revision = 0
+	last_update = 0
+	total_play_time = 0 # Kept up to date by the players, recounted when loading
+
 	def __init__(self, host, port=None):
 		self.favicon = Favicon()
 		
 		self.protocol_version = None
 		self.server_version = None
 		self.secure_chat = None
-		self.mods = []
+		self.mods = ()
 		self.host = host
 		self.port = port
 		self.tags = set()
@@ -109,11 +427,19 @@ class Server:
 		self.active_players = 0
 		self.max_players = 0
 		self.players = list()
+		self.total_play_time = 0
 
 		self.active = False
 
+	def attached(self):
+		# False once the server was removed from its host, evicted servers can still be queued or mid-probe
+		return bool(self.host) and self.host.get_server(self.port) is self
+
 	def get_play_time(self):
-		return sum([player.play_time for player in self.players])
+		return self.total_play_time
+
+	def recount(self):
+		self.total_play_time = sum(player.play_time for player in self.players)
 
 	def get_player(self, name=None, uuid=None):
 		return next((player for player in self.players if player.name == name or player.uuid == uuid), None)
@@ -128,17 +454,38 @@ class Server:
 		return player
 	
 	def remove_player(self, name=None, uuid=None):
-		self.players.remove(self.get_player(name, uuid))
+		before = Events.snapshot(self)
+		player = self.get_player(name, uuid)
+
+		self.players.remove(player)
+		self.total_play_time -= player.play_time
+		self.revision += 1
+		self.host.changed(self, before)
 
 	def update_favicon(self, favicon):
 		self.favicon.load_multipart(favicon)
 	
-	def parse_status(self, obj):
+	def set_inactive(self):
+		before = Events.snapshot(self)
+		self.active = False
+		self.active_players = 0
+		for player in self.players:
+			player.active = False
+		
+		self.revision += 1
+		self.host.changed(self, before)
+
+	def parse_status(self, obj, timestamp=None):
+		before = Events.snapshot(self)
+		self.last_update = timestamp or time.time()
+		self.active = True
+		self.revision += 1
+
 		if "version" in obj:
 			self.parse_version(obj["version"])
 
 		if "players" in obj:
-			self.parse_players(obj["players"])
+			self.parse_players(obj["players"], self.last_update)
 		
 		if "forgeData" in obj:
 			self.parse_forge_data(obj["forgeData"])
@@ -150,31 +497,33 @@ class Server:
 		
 		if "enforcesSecureChat" in obj:
 			self.secure_chat = obj["enforcesSecureChat"]
+		
+		self.host.changed(self, before)
+
+	def add_tag(self, tag):
+		self.tags.add(tag)
+		self.host.reindex(self)
+	
+	def remove_tag(self, tag):
+		self.tags.discard(tag)
+		self.host.reindex(self)
 	
 	def parse_forge_data(self, obj):
 		if "mods" in obj:
-			mod_list = []
-			for mod in obj["mods"]:
-				mod_list.append(Mod().parse_forge(mod))
-
-			self.mods = mod_list
+			self.mods = g_intern_pool.mod_list(Mod.parse_forge(mod) for mod in obj["mods"])
 	
 	def parse_fml_data(self, obj):
 		if "modList" in obj:
-			mod_list = []
-			for mod in obj["modList"]:
-				mod_list.append(Mod().parse_fml(mod))
-
-			self.mods = mod_list
+			self.mods = g_intern_pool.mod_list(Mod.parse_fml(mod) for mod in obj["modList"])
 
 	def parse_version(self, obj):
 		if "name" in obj:
-			self.server_version = obj["name"]
+			self.server_version = g_intern_pool.string(obj["name"])
 		
 		if "protocol" in obj:
 			self.protocol_version = obj["protocol"]
 	
-	def parse_players(self, obj):
+	def parse_players(self, obj, timestamp=None):
 		self.active_players = obj["online"]
 		self.max_players = obj["max"]
 
@@ -183,7 +532,7 @@ class Server:
 			for player_sample in obj["sample"]:
 				player = self.get_or_add_player(player_sample["name"], player_sample["id"])
 				player.parse_player(player_sample)
-				player.update_last_seen()
+				player.update_last_seen(timestamp)
 				player.active = True
 				seen.append(player)
 			
@@ -191,8 +540,87 @@ class Server:
 			if player not in seen:
 				player.active = False
 
+	def merge(self, other):
+		newer = other.last_update > self.last_update
+		changed = False
+
+		if newer:
+			for key in ["favicon", "protocol_version", "server_version", "secure_chat", "mods", "active_players", "max_players", "active", "last_update"]:
+				setattr(self, key, getattr(other, key))
+			changed = True
+		
+		if not other.tags <= self.tags:
+			self.tags |= other.tags
+			changed = True
+
+		players = {player.uuid: player for player in self.players}
+		for other_player in other.players:
+			player = players.get(other_player.uuid)
+
+			if not player:
+				other_player.server = self
+				self.players.append(other_player)
+				changed = True
+			else:
+				changed |= player.merge(other_player)
+		
+		if newer:
+			active = {player.uuid for player in other.players if player.active}
+			for player in self.players:
+				player.active = player.uuid in active
+
+		if changed:
+			self.recount()
+			self.revision += 1
+		
+		return changed
+
+	def diff(self, other):
+		changes = {}
+
+		for event in Events.diff(self, Events.snapshot(self), Events.snapshot(other)):
+			match event.topic:
+				case "players":
+					[[old_active, old_seen], [active, seen]] = [event.old, event.new]
+					if old_active != active:
+						changes["active_players"] = [old_active, active]
+					if old_seen != seen:
+						changes["players_seen"] = [old_seen, seen]
+
+				case "mods":
+					# Compared by mod id, a list that was only reordered isn't a change
+					old = {mod.id: mod.version for mod in event.old}
+					new = {mod.id: mod.version for mod in event.new}
+					mods = {
+						"added": sorted(new.keys() - old.keys()),
+						"removed": sorted(old.keys() - new.keys()),
+						"updated": sorted(mod_id for mod_id in old.keys() & new.keys() if old[mod_id] != new[mod_id]),
+					}
+					if any(mods.values()):
+						changes["mods"] = mods
+
+				case "activity":
+					changes["active"] = [event.old, event.new]
+
+				case topic:
+					changes[topic] = [event.old, event.new]
+		
+		if self.max_players != other.max_players:
+			changes["max_players"] = [self.max_players, other.max_players]
+
+		if self.tags != other.tags:
+			changes["tags"] = {"added": sorted(other.tags - self.tags), "removed": sorted(self.tags - other.tags)}
+
+		return changes
+
+	def get_summary(self):
+		return {
+			"address": self.host.address, "port": self.port, "version": self.server_version, "active": self.active,
+			"active_players": self.active_players, "players_seen": len(self.players), "mod_count": len(self.mods),
+		}
+
 	def get_dict(self):
-		return {key: value for key, value in self.__dict__.items() if key != "host"}
+		return {key: value for key, value in self.__dict__.items() if key not in ["host", "revision"]}
 
 class Player:
 	def __init__(self, server, name=None, uuid=None):
@@ -207,6 +635,8 @@ class Player:
 		self.premium_name = None
 
 	def verify_premium(self):
+		import requests
+
 		try:
 			self.premium_uuid = requests.get(f"https://sessionserver.mojang.com/session/minecraft/profile/{self.uuid}").status_code == 200
 			self.premium_name = requests.get(f"https://api.mojang.com/users/profiles/minecraft/{self.name}").status_code == 200
@@ -216,6 +646,9 @@ class Player:
 		self.last_verified = time.time()
 	
 	async def verify_premium_async(self):
+		import aiohttp.client_exceptions
+		import aiohttp
+
 		exceptions = aiohttp.client_exceptions
 		try:
 			async with aiohttp.ClientSession() as session:
@@ -226,14 +659,37 @@ class Player:
 		
 		self.last_verified = time.time()
 
-	def update_last_seen(self):
-		current_time = time.time()
+	def update_last_seen(self, current_time=None):
+		current_time = current_time or time.time()
 
 		if self.active:
-			self.play_time += current_time - self.last_seen
+			delta = current_time - self.last_seen
+			self.play_time += delta
+			self.server.total_play_time += delta
 		
 		self.last_seen = current_time
 
+	def merge(self, other):
+		changed = False
+
+		if other.last_seen > self.last_seen:
+			self.last_seen = other.last_seen
+			self.name = other.name
+			self.active = other.active
+			changed = True
+		
+		if other.play_time > self.play_time:
+			self.play_time = other.play_time
+			changed = True
+		
+		if other.last_verified > self.last_verified:
+			self.last_verified = other.last_verified
+			self.premium_uuid = other.premium_uuid
+			self.premium_name = other.premium_name
+			changed = True
+		
+		return changed
+
 	def parse_player(self, obj):
 		self.name = obj["name"]
 		self.uuid = obj["id"]
@@ -243,16 +699,78 @@ class Player:
 		return {key: value for key, value in self.__dict__.items() if key != "server"}
 
 class Mod:
+	__slots__ = ("version", "id")
+
 	def __init__(self, mod_id=None, mod_version=None):
-		self.version = mod_version
-		self.id = mod_id
-	
-	def parse_forge(self, obj):
-		self.version = obj["modmarker"]
-		self.id = obj["modId"]
-		return self
+		object.__setattr__(self, "version", mod_version)
+		object.__setattr__(self, "id", mod_id)
+
+	def __setattr__(self, name, value):
+		raise AttributeError("Mods are shared between servers and can't be modified, use InternPool.mod instead")
+
+	def __reduce__(self):
+		return (intern_mod, (self.id, self.version))
+
+	def __setstate__(self, state):
+		# Mods pickled before interning was introduced carry their fields in a dict
+		for name, value in state.items():
+			object.__setattr__(self, name, value)
+
+	@staticmethod
+	def parse_forge(obj):
+		return g_intern_pool.mod(obj["modId"], obj["modmarker"])
 	
-	def parse_fml(self, obj):
-		self.version = obj["version"]
-		self.id = obj["modid"]
-		return self
\ No newline at end of file
+	@staticmethod
+	def parse_fml(obj):
+		return g_intern_pool.mod(obj["modid"], obj["version"])
+
+	def get_dict(self):
+		return {"version": self.version, "id": self.id}
+
+class InternPool:
+	def __init__(self):
+		self.strings = {}
+		self.mods = {}
+		self.mod_lists = {}
+
+	def string(self, value):
+		if not isinstance(value, str):
+			return value
+		
+		return self.strings.setdefault(value, value)
+
+	def mod(self, mod_id, version):
+		key = (mod_id, version)
+		mod = self.mods.get(key)
+
+		if mod == None:
+			mod = self.mods[key] = Mod(self.string(mod_id), self.string(version))
+		
+		return mod
+
+	def mod_list(self, mods):
+		mods = tuple(self.mod(mod.id, mod.version) for mod in mods)
+		return self.mod_lists.setdefault(mods, mods)
+
+	def intern_server(self, server):
+		server.server_version = self.string(server.server_version)
+		server.mods = self.mod_list(server.mods)
+
+	def rebuild(self, servers):
+		# The pool only grows while interning, this drops what no server uses anymore (evicted servers, replaced mod lists)
+		# The live objects are kept as the canonical ones, so nothing that is already shared gets copied
+		self.__init__()
+
+		for server in servers:
+			self.string(server.server_version)
+			self.mod_lists.setdefault(server.mods, server.mods)
+
+			for mod in server.mods:
+				self.mods.setdefault((mod.id, mod.version), mod)
+				self.string(mod.id)
+				self.string(mod.version)
+
+g_intern_pool = InternPool()
+
+def intern_mod(mod_id, version):
+	return g_intern_pool.mod(mod_id, version)
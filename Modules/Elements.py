@@ -130,15 +130,10 @@ class ScrollingFrame(BaseElement):
 
 	def iterate(self):
 		scroll = self.scroll
-		sy = self.size.y
+		items = self.items
 
-		for idx, item in enumerate(self.items):
-			if idx < scroll:
-				continue
-			if idx - scroll >= sy:
-				break
-			
-			yield idx, idx - scroll, item
+		for idx in range(scroll, min(len(items), scroll + self.size.y)):
+			yield idx, idx - scroll, items[idx]
 
 	def current_item(self):
 		idx = self.scroll + self.cursor
@@ -154,4 +149,76 @@ class ScrollingFrame(BaseElement):
 		return (self.cursor, self.scroll)
 	
 	def set_state(self, state):
-		self.set_scroll(*state)
\ No newline at end of file
+		self.set_scroll(*state)
+
+class FrameBuffer:
+	def __init__(self, size_y, size_x):
+		self.size = Vector2(size_x, size_y)
+		self.rows = [[] for _ in range(size_y)]
+
+	def getmaxyx(self):
+		return self.size.yx
+
+	def addstr(self, y, x, string, attributes=0):
+		if 0 <= y < self.size.y and x < self.size.x:
+			self.rows[y].append((x, string[:self.size.x - x], attributes))
+
+	def chgat(self, y, x, count, attributes):
+		if 0 <= y < self.size.y and x < self.size.x:
+			self.rows[y].append((x, count, attributes))
+
+
+class Renderer:
+	def __init__(self, screen: curses.window, max_fps=20):
+		self.screen = screen
+		self.frame_time = 1 / max_fps
+		self.last_frame = 0
+		self.frames = 0
+		self.rows_drawn = 0
+		self.rows = []
+		self.size = None
+
+	def invalidate(self):
+		self.rows = []
+
+	def ready(self, now, interval=None):
+		return now - self.last_frame >= max(self.frame_time, interval or 0)
+
+	def new_frame(self):
+		size = self.screen.getmaxyx()
+
+		if size != self.size:
+			self.size = size
+			self.invalidate()
+			self.screen.erase()
+		
+		return FrameBuffer(*size)
+
+	def _draw_row(self, y, row):
+		screen = self.screen
+
+		screen.move(y, 0)
+		screen.clrtoeol()
+		for operation in row:
+			try:
+				if isinstance(operation[1], str):
+					screen.addstr(y, *operation)
+				else:
+					screen.chgat(y, *operation)
+			except curses.error:
+				pass # Writing the bottom-right cell moves the cursor out of bounds
+
+	def present(self, frame, now):
+		previous = self.rows
+
+		for y, row in enumerate(frame.rows):
+			if y < len(previous) and previous[y] == row:
+				continue
+
+			self._draw_row(y, row)
+			self.rows_drawn += 1
+		
+		self.rows = frame.rows
+		self.last_frame = now
+		self.frames += 1
+		self.screen.refresh()
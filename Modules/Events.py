@@ -0,0 +1,152 @@
+import collections
+
+
+class ServerEvent:
+	topic = None
+
+	def __init__(self, server, old=None, new=None):
+		self.server = server
+		self.old = old
+		self.new = new
+
+	def __repr__(self):
+		return f"{type(self).__name__}({self.server.host.address}:{self.server.port}, {self.old!r} -> {self.new!r})"
+
+class ServerOnline(ServerEvent):
+	topic = "activity"
+
+class ServerOffline(ServerEvent):
+	topic = "activity"
+
+class PlayerCountChanged(ServerEvent):
+	topic = "players" # (active players, seen players)
+
+class VersionChanged(ServerEvent):
+	topic = "version"
+
+class ModsChanged(ServerEvent):
+	topic = "mods"
+
+class FaviconChanged(ServerEvent):
+	topic = "favicon" # crc32
+
+class ServerRemoved(ServerEvent):
+	topic = "removed" # (address, port), the server may have been detached from its host since
+
+
+def snapshot(server):
+	return (server.active, (server.active_players, len(server.players)), server.server_version, server.mods, server.favicon.crc32)
+
+
+def diff(server, before, after):
+	[was_active, old_players, old_version, old_mods, old_favicon] = before
+	[active, players, version, mods, favicon] = after
+
+	if was_active != active:
+		yield (active and ServerOnline or ServerOffline)(server, was_active, active)
+
+	if old_players != players:
+		yield PlayerCountChanged(server, old_players, players)
+
+	if old_version != version:
+		yield VersionChanged(server, old_version, version)
+
+	# Mod lists are interned, so equal lists are the same tuple
+	if old_mods is not mods:
+		yield ModsChanged(server, old_mods, mods)
+
+	if old_favicon != favicon:
+		yield FaviconChanged(server, old_favicon, favicon)
+
+
+class Subscription:
+	def __init__(self, bus, event_types=None, coalesce=False, maxsize=0):
+		self.bus = bus
+		self.event_types = event_types and tuple(event_types)
+		self.coalesce = coalesce
+		self.maxsize = maxsize
+
+		self.events = collections.deque()
+		self.pending = {}
+		self.waiter = None
+		self.dropped = 0
+
+	def accepts(self, event):
+		return not self.event_types or isinstance(event, self.event_types)
+
+	def push(self, event):
+		if self.coalesce:
+			key = (event.topic, event.server)
+			previous = self.pending.pop(key, None)
+
+			if previous:
+				# Keep the oldest value so the merged event still describes the whole change
+				if previous.old == event.new:
+					return
+
+				event = type(event)(event.server, previous.old, event.new)
+
+			self.pending[key] = event
+		else:
+			if self.maxsize and len(self.events) >= self.maxsize:
+				self.events.popleft()
+				self.dropped += 1
+
+			self.events.append(event)
+
+		if self.waiter and not self.waiter.done():
+			self.waiter.set_result(None)
+
+	def empty(self):
+		return not self.events and not self.pending
+
+	def drain(self):
+		if self.coalesce:
+			events = list(self.pending.values())
+			self.pending.clear()
+		else:
+			events = list(self.events)
+			self.events.clear()
+
+		return events
+
+	async def get(self):
+		import asyncio # Only needed by async consumers, which already have it loaded
+
+		while self.empty():
+			self.waiter = asyncio.get_running_loop().create_future()
+			await self.waiter
+
+		if self.coalesce:
+			key = next(iter(self.pending))
+			return self.pending.pop(key)
+
+		return self.events.popleft()
+
+	def __aiter__(self):
+		return self
+
+	async def __anext__(self):
+		return await self.get()
+
+	def close(self):
+		self.bus.unsubscribe(self)
+
+
+class EventBus:
+	def __init__(self):
+		self.subscriptions = []
+
+	def subscribe(self, event_types=None, coalesce=False, maxsize=0):
+		subscription = Subscription(self, event_types, coalesce, maxsize)
+		self.subscriptions.append(subscription)
+		return subscription
+
+	def unsubscribe(self, subscription):
+		if subscription in self.subscriptions:
+			self.subscriptions.remove(subscription)
+
+	def emit(self, event):
+		for subscription in self.subscriptions:
+			if subscription.accepts(event):
+				subscription.push(event)
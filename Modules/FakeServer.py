@@ -0,0 +1,199 @@
+import asyncio
+import base64
+import random
+import socket
+import json
+import uuid
+
+
+def encode_varint(value):
+	value &= 0xFFFFFFFF
+	result = bytearray()
+
+	while True:
+		byte = value & 0x7F
+		value >>= 7
+
+		if value:
+			result.append(byte | 0x80)
+		else:
+			result.append(byte)
+			return bytes(result)
+
+
+def encode_string(string):
+	data = string.encode("utf-8")
+	return encode_varint(len(data)) + data
+
+
+def encode_packet(packet_id, data=b""):
+	payload = encode_varint(packet_id) + data
+	return encode_varint(len(payload)) + payload
+
+
+async def read_varint(reader):
+	result = 0
+
+	for shift in range(0, 35, 7):
+		[byte] = await reader.readexactly(1)
+		result |= (byte & 0x7F) << shift
+
+		if not byte & 0x80:
+			return result
+
+	raise ValueError("VarInt is too big")
+
+
+async def read_packet(reader):
+	length = await read_varint(reader)
+	data = await reader.readexactly(length)
+
+	# Packet IDs are always a single byte in the handshake and status states
+	return data[0], data[1:]
+
+
+class FakeServerConfig:
+	def __init__(
+		self, max_players=100, online=20, sample=12, mods=0, mod_format="forge", favicon_size=0,
+		latency=0, jitter=0, failure_rate=0, timeout_rate=0, version="Paper 1.20.4", protocol=765, seed=0
+	):
+		self.max_players = max_players
+		self.online = online
+		self.sample = sample
+		self.mods = mods
+		self.mod_format = mod_format
+		self.favicon_size = favicon_size
+		self.latency = latency
+		self.jitter = jitter
+		self.failure_rate = failure_rate
+		self.timeout_rate = timeout_rate
+		self.version = version
+		self.protocol = protocol
+		self.seed = seed
+
+
+class FakeServer:
+	def __init__(self, config=None, host="127.0.0.1"):
+		self.config = config or FakeServerConfig()
+		self.host = host
+		self.random = random.Random(self.config.seed)
+		self.responses = {}
+		self.servers = []
+		self.ports = []
+
+		self.requests = 0
+		self.failures = 0
+		self.timeouts = 0
+
+	def build_status(self, port):
+		config = self.config
+		generator = random.Random(config.seed * 65536 + port)
+
+		status = {
+			"version": {"name": config.version, "protocol": config.protocol},
+			"players": {
+				"max": config.max_players,
+				"online": config.online,
+				"sample": [
+					{"name": f"Player{generator.randrange(1 << 20)}", "id": str(uuid.UUID(int=generator.getrandbits(128)))}
+					for _ in range(min(config.sample, config.online))
+				]
+			},
+			"description": {"text": f"Fake server on port {port}"},
+			"enforcesSecureChat": bool(port & 1),
+		}
+
+		mods = [(f"fakemod{generator.randrange(config.mods * 4)}", f"1.{generator.randrange(20)}.0") for _ in range(config.mods)]
+		if mods and config.mod_format == "forge":
+			status["forgeData"] = {"mods": [{"modId": mod_id, "modmarker": version} for mod_id, version in mods]}
+		elif mods:
+			status["modinfo"] = {"type": "FML", "modList": [{"modid": mod_id, "version": version} for mod_id, version in mods]}
+
+		if config.favicon_size:
+			favicon = generator.randbytes(config.favicon_size)
+			status["favicon"] = "data:image/png;base64," + base64.b64encode(favicon).decode()
+
+		return status
+
+	def get_response(self, port):
+		response = self.responses.get(port)
+
+		if not response:
+			response = self.responses[port] = encode_packet(0, encode_string(json.dumps(self.build_status(port))))
+
+		return response
+
+	async def handle(self, reader, writer, port):
+		config = self.config
+		self.requests += 1
+
+		try:
+			roll = self.random.random()
+			if roll < config.failure_rate:
+				self.failures += 1
+				return
+
+			await read_packet(reader) # Handshake
+			await read_packet(reader) # Status request
+
+			if roll < config.failure_rate + config.timeout_rate:
+				self.timeouts += 1
+				await reader.read() # Hold the connection until the client gives up
+				return
+
+			delay = config.latency + self.random.uniform(-config.jitter, config.jitter)
+			if delay > 0:
+				await asyncio.sleep(delay)
+
+			writer.write(self.get_response(port))
+			await writer.drain()
+
+			[packet_id, data] = await read_packet(reader)
+			if packet_id == 1:
+				writer.write(encode_packet(1, data))
+				await writer.drain()
+		except (OSError, ValueError, asyncio.IncompleteReadError, asyncio.CancelledError):
+			pass
+		finally:
+			writer.close()
+
+	async def start(self, count=1, base_port=0):
+		for idx in range(count):
+			sock = socket.socket(socket.AF_INET6 if ':' in self.host else socket.AF_INET, socket.SOCK_STREAM)
+			sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+			sock.bind((self.host, base_port and base_port + idx or 0))
+			port = sock.getsockname()[1]
+
+			server = await asyncio.start_server(
+				lambda reader, writer, port=port: self.handle(reader, writer, port), sock=sock, backlog=1024
+			)
+			self.servers.append(server)
+			self.ports.append(port)
+
+		return self.ports
+
+	async def stop(self):
+		for server in self.servers:
+			server.close()
+
+		for server in self.servers:
+			await server.wait_closed()
+
+		self.servers = []
+
+
+def serve(config, count, base_port, connection, hosts=None):
+	# multiprocessing target, sends the bound ports back (a (host, ports) pair per host when hosts are given) and serves until told to stop
+	async def run():
+		servers = [FakeServer(config, host) for host in hosts or ["127.0.0.1"]]
+		ports = [await server.start(count, base_port) for server in servers]
+		connection.send(hosts and list(zip(hosts, ports)) or ports[0])
+
+		loop = asyncio.get_running_loop()
+		await loop.run_in_executor(None, connection.recv)
+		connection.send({key: sum(getattr(server, key) for server in servers) for key in ["requests", "failures", "timeouts"]})
+
+		for server in servers:
+			await server.stop()
+
+	asyncio.run(run())
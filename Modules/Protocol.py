@@ -1,18 +1,65 @@
 import asyncio
+import time
 
-from mcproto.packets.handshaking.handshake import Handshake, NextState
-from mcproto.packets.status.status import StatusRequest
-from mcproto.packets.packet import PacketDirection, GameState
-from mcproto.connection import TCPAsyncConnection
-from mcproto.packets import async_write_packet, async_read_packet, generate_packet_map
+# mcproto is imported by the first probe, most of the import cost of every entry point came from it
 
-STATUS_CLIENTBOUND_MAP = generate_packet_map(PacketDirection.CLIENTBOUND, GameState.STATUS)
+g_status_packet_map = None
 
 
-async def async_server_status(address, port, protocol=47, timeout=5):
+def status_packet_map():
+	global g_status_packet_map
+
+	if g_status_packet_map == None:
+		from mcproto.packets.packet import PacketDirection, GameState
+		from mcproto.packets import generate_packet_map
+
+		g_status_packet_map = generate_packet_map(PacketDirection.CLIENTBOUND, GameState.STATUS)
+
+	return g_status_packet_map
+
+
+class StatusProbe:
+	# Outcome of a single status request, times are in seconds
+	def __init__(self):
+		self.status = None
+		self.error = None
+		self.connect_time = None
+		self.read_time = None
+
+
+def classify_error(error, connected):
+	match error:
+		case asyncio.exceptions.TimeoutError():
+			return connected and "read_timeout" or "connect_timeout"
+		case ConnectionRefusedError():
+			return "refused"
+		case ConnectionResetError() | BrokenPipeError():
+			return "reset"
+		case KeyError():
+			return "protocol" # Unexpected packet id
+		case asyncio.exceptions.CancelledError():
+			return "cancelled"
+		case _:
+			return connected and "closed" or "unreachable"
+
+
+async def async_probe_status(address, port, protocol=47, timeout=5, connect_address=None):
+	# connect_address is the resolved address, the handshake still carries the name so virtual hosts keep working
+	from mcproto.packets.handshaking.handshake import Handshake, NextState
+	from mcproto.packets.status.status import StatusRequest
+	from mcproto.connection import TCPAsyncConnection
+	from mcproto.packets import async_write_packet, async_read_packet
+
+	packet_map = status_packet_map()
 	exceptions = asyncio.exceptions
+	probe = StatusProbe()
+	start = time.perf_counter()
+
 	try:
-		async with await TCPAsyncConnection.make_client((address, port), timeout) as client:
+		async with await TCPAsyncConnection.make_client((connect_address or address, port), timeout) as client:
+			probe.connect_time = time.perf_counter() - start
+			start = time.perf_counter()
+
 			await async_write_packet(client, Handshake(
 				protocol_version=protocol,
 				server_address=address,
@@ -21,6 +68,14 @@ async def async_server_status(address, port, protocol=47, timeout=5):
 			))
 			await async_write_packet(client, StatusRequest())
 
-			return (await async_read_packet(client, STATUS_CLIENTBOUND_MAP)).data
-	except (KeyError, OSError, exceptions.TimeoutError, exceptions.CancelledError):
-		return False
\ No newline at end of file
+			probe.status = (await async_read_packet(client, packet_map)).data
+			probe.read_time = time.perf_counter() - start
+	except (KeyError, OSError, exceptions.TimeoutError, exceptions.CancelledError) as error:
+		probe.error = classify_error(error, probe.connect_time != None)
+
+	return probe
+
+
+async def async_server_status(address, port, protocol=47, timeout=5, connect_address=None):
+	probe = await async_probe_status(address, port, protocol, timeout, connect_address)
+	return probe.error == None and probe.status or False
@@ -0,0 +1,208 @@
+import gzip
+import json
+import zlib
+import time
+import os
+
+
+def open_text(filename, mode):
+	# Files ending in ".gz" are transparently compressed
+	if filename.endswith(".gz"):
+		return gzip.open(filename, mode + "t", encoding="utf-8")
+
+	return open(filename, mode, encoding="utf-8")
+
+
+def read_lines(filename):
+	# Stops at a record (or compressed block) cut short by an interruption
+	with open_text(filename, "r") as file:
+		try:
+			for line in file:
+				if not line.endswith('\n'):
+					return
+
+				yield line
+		except (EOFError, gzip.BadGzipFile, zlib.error):
+			return
+
+
+def repair_compressed(filename):
+	# A gzip stream can't be truncated in place, so the readable records are copied to a new file instead
+	try:
+		with gzip.open(filename, "rb") as file:
+			tail = b'\n'
+			while chunk := file.read(1 << 20):
+				tail = chunk[-1:]
+
+		if tail == b'\n':
+			return
+	except (EOFError, gzip.BadGzipFile, zlib.error):
+		pass
+
+	with gzip.open(filename + ".tmp", "wt", encoding="utf-8") as file:
+		file.writelines(read_lines(filename))
+
+	os.replace(filename + ".tmp", filename)
+
+
+def repair_file(filename):
+	# Drops a partially written trailing record so appended records start on their own line
+	if not os.path.exists(filename):
+		return
+
+	if filename.endswith(".gz"):
+		return repair_compressed(filename)
+
+	with open(filename, "rb+") as file:
+		file.seek(0, os.SEEK_END)
+		size = file.tell()
+		position = size
+
+		while position > 0:
+			step = min(4096, position)
+			file.seek(position - step)
+			chunk = file.read(step)
+			newline = chunk.rfind(b'\n')
+
+			if newline != -1:
+				position = position - step + newline + 1
+				break
+
+			position -= step
+
+		if position != size:
+			file.truncate(position)
+
+
+class RecordWriter:
+	def __init__(self, filename, append=False, flush_interval=0):
+		if append:
+			repair_file(filename)
+
+		self.file = open_text(filename, append and "a" or "w")
+		self.flush_interval = flush_interval # Flushing compressed files often hurts the compression ratio
+		self.last_flush = 0
+		self.count = 0
+
+	def write(self, address, port, status, timestamp=None):
+		record = {"address": address, "port": port, "time": timestamp or time.time(), "status": status}
+		self.file.write(json.dumps(record, separators=(',', ':')) + '\n')
+		self.count += 1
+
+		now = time.monotonic()
+		if now - self.last_flush >= self.flush_interval:
+			self.file.flush()
+			self.last_flush = now
+
+	def close(self):
+		self.file.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *_):
+		self.close()
+
+
+def read_records(filename):
+	for line in read_lines(filename):
+		yield json.loads(line)
+
+
+class Checkpoint:
+	# One line per finished port ("host port") and per host once all of its ports are done ("host")
+	def __init__(self, filename, settings):
+		self.filename = filename
+		self.settings = settings
+		self.finished = set()
+		self.done = {} # host -> ports finished on hosts that aren't finished yet
+		self.remaining = {}
+		self.file = None
+
+	def load(self):
+		if not os.path.exists(self.filename):
+			return False
+
+		with open(self.filename, "r", encoding="utf-8") as file:
+			lines = iter(file)
+			header = next(lines, None)
+
+			if header == None:
+				return False
+
+			assert json.loads(header) == self.settings, f"The checkpoint in \"{self.filename}\" was made with different scan settings"
+
+			for line in lines:
+				if not line.endswith('\n'):
+					continue
+
+				[host, _, port] = line.strip().partition(' ')
+				if port:
+					self.done.setdefault(host, set()).add(int(port))
+				else:
+					self.finished.add(host)
+
+		for host in self.finished:
+			self.done.pop(host, None)
+
+		return True
+
+	def skip_recorded(self, filename):
+		# A record can be written right before an interruption keeps its port from being checkpointed
+		if not os.path.exists(filename):
+			return
+
+		for record in read_records(filename):
+			if record["address"] not in self.finished:
+				self.done.setdefault(record["address"], set()).add(record["port"])
+
+	def open(self, resume):
+		if resume and self.load():
+			repair_file(self.filename)
+			self.file = open(self.filename, "a", encoding="utf-8")
+		else:
+			self.file = open(self.filename, "w", encoding="utf-8")
+			self.file.write(json.dumps(self.settings) + '\n')
+			self.file.flush()
+
+	def is_finished(self, host):
+		return host in self.finished
+
+	def pending_ports(self, host, ports):
+		# The ports of a host that still have to be probed, a host with none left is finished right away
+		if host in self.finished:
+			return []
+
+		done = self.done.get(host, ())
+		ports = [port for port in ports if port not in done]
+
+		if not ports and host not in self.remaining:
+			self.finish(host)
+
+		return ports
+
+	def expect(self, host, count):
+		self.remaining[host] = self.remaining.get(host, 0) + count
+
+	def finish(self, host):
+		self.finished.add(host)
+		self.done.pop(host, None)
+		self.file.write(host + '\n')
+		self.file.flush()
+
+	def complete(self, host, port):
+		self.file.write(f"{host} {port}\n")
+
+		remaining = self.remaining[host] - 1
+
+		if remaining:
+			self.remaining[host] = remaining
+			self.file.flush()
+			return
+
+		del self.remaining[host]
+		self.finish(host)
+
+	def close(self):
+		if self.file:
+			self.file.close()
@@ -0,0 +1,28 @@
+import asyncio
+import time
+
+
+def apply(server, record):
+	# Recorded timestamps are kept so replaying the same capture always produces the same state
+	if record["status"]:
+		server.parse_status(record["status"], record["time"])
+	else:
+		server.set_inactive()
+
+
+async def play(records, speed=1.0):
+	# Yields records spaced like they were captured (divided by speed), a speed of 0 doesn't wait at all
+	start = None
+	first = None
+
+	for record in records:
+		if speed:
+			if start == None:
+				start = time.monotonic()
+				first = record["time"]
+
+			delay = (record["time"] - first) / speed - (time.monotonic() - start)
+			if delay > 0:
+				await asyncio.sleep(delay)
+		
+		yield record
@@ -0,0 +1,145 @@
+import ipaddress
+import asyncio
+import socket
+import time
+
+c_ttl = 300 # Seconds a successful lookup is cached for
+c_negative_ttl = 30 # Seconds a failed lookup is cached for
+c_prune_interval = 60 # Seconds between sweeps of expired cache entries
+c_default_port = 25565
+c_srv_prefix = "_minecraft._tcp."
+
+
+def is_address(host):
+	try:
+		ipaddress.ip_address(host)
+		return True
+	except ValueError:
+		return False
+
+
+class SystemBackend:
+	# Addresses come from the loop's getaddrinfo (a thread pool), SRV records need the optional aiodns package
+	def __init__(self):
+		self.dns = None
+
+	async def resolve(self, host):
+		infos = await asyncio.get_running_loop().getaddrinfo(host, None, type=socket.SOCK_STREAM)
+		return list(dict.fromkeys(info[4][0] for info in infos))
+
+	async def resolve_srv(self, name):
+		try:
+			import aiodns
+		except ImportError:
+			return []
+
+		if not self.dns:
+			self.dns = aiodns.DNSResolver()
+
+		try:
+			records = await self.dns.query(name, "SRV")
+		except aiodns.error.DNSError:
+			return []
+
+		records = sorted(records, key=lambda record: (record.priority, -record.weight))
+		return [(record.host, record.port) for record in records]
+
+
+class StaticBackend:
+	# Answers from fixed tables, meant for tests and benchmarks that can't depend on real DNS
+	def __init__(self, hosts=None, services=None, delay=0):
+		self.hosts = hosts or {}
+		self.services = services or {}
+		self.delay = delay
+		self.lookups = 0
+
+	async def resolve(self, host):
+		self.lookups += 1
+		await asyncio.sleep(self.delay)
+
+		if host not in self.hosts:
+			raise socket.gaierror(socket.EAI_NONAME, "Name or service not known")
+
+		return list(self.hosts[host])
+
+	async def resolve_srv(self, name):
+		self.lookups += 1
+		await asyncio.sleep(self.delay)
+		return list(self.services.get(name, []))
+
+
+class Resolver:
+	def __init__(self, backend=None, ttl=c_ttl, negative_ttl=c_negative_ttl, srv=True, prune_interval=c_prune_interval):
+		self.backend = backend or SystemBackend()
+		self.ttl = ttl
+		self.negative_ttl = negative_ttl
+		self.srv = srv
+		self.prune_interval = prune_interval
+		self.next_prune = time.monotonic() + prune_interval
+
+		self.cache = {} # (kind, name) -> (expiry, answer)
+		self.pending = {} # (kind, name) -> lookup task shared by every caller
+		self.hits = 0
+		self.misses = 0
+		self.shared = 0
+
+	async def _lookup(self, key, function):
+		try:
+			answer = await function(key[1])
+		except (OSError, UnicodeError): # UnicodeError comes from hostnames that can't be IDNA encoded
+			answer = []
+
+		now = time.monotonic()
+		self.cache[key] = (now + (answer and self.ttl or self.negative_ttl), answer)
+
+		# Only misses add entries, so sweeping here keeps the cache bounded by the names looked up within a TTL
+		if now >= self.next_prune:
+			self._prune(now)
+
+		return answer
+
+	def _prune(self, now):
+		# Names of evicted servers are never asked for again and would otherwise stay cached forever
+		self.cache = {key: entry for key, entry in self.cache.items() if entry[0] > now}
+		self.next_prune = now + self.prune_interval
+
+	async def _cached(self, key, function):
+		entry = self.cache.get(key)
+
+		if entry and entry[0] > time.monotonic():
+			self.hits += 1
+			return entry[1]
+
+		task = self.pending.get(key)
+		if task:
+			self.shared += 1
+		else:
+			self.misses += 1
+			task = self.pending[key] = asyncio.ensure_future(self._lookup(key, function))
+			task.add_done_callback(lambda _: self.pending.pop(key, None))
+
+		# Shielded so a cancelled caller doesn't cancel the lookup everyone else is waiting on
+		return await asyncio.shield(task)
+
+	async def resolve(self, host):
+		if is_address(host):
+			return [host]
+
+		return await self._cached(("A", host.lower()), self.backend.resolve)
+
+	async def resolve_srv(self, host):
+		return await self._cached(("SRV", host.lower()), lambda host: self.backend.resolve_srv(c_srv_prefix + host))
+
+	async def resolve_server(self, host, port=c_default_port):
+		# Like the game client, SRV records are only looked up for hostnames on the default port
+		if self.srv and port == c_default_port and not is_address(host):
+			for [target, target_port] in await self.resolve_srv(host):
+				addresses = await self.resolve(target.rstrip('.'))
+				if addresses:
+					return addresses[0], target_port
+
+		addresses = await self.resolve(host)
+		return addresses and (addresses[0], port) or None
+
+	def metrics(self):
+		return {"hits": self.hits, "misses": self.misses, "shared": self.shared, "entries": len(self.cache)}
@@ -0,0 +1,233 @@
+import base64
+import pickle
+import json
+import time
+import io
+
+from Modules import DataStructure
+from Modules import Records
+from Modules import Events
+
+c_day = 86400
+c_batch_size = 256 # Servers checked per step
+c_step_interval = 0.05 # Seconds between steps
+c_pass_interval = 600 # Seconds between passes over the whole state
+
+
+class RetentionPolicy:
+	def __init__(self, player_days=None, server_days=None, max_players=None):
+		self.player_days = player_days
+		self.server_days = server_days
+		self.max_players = max_players
+
+	def enabled(self):
+		return self.player_days != None or self.server_days != None or self.max_players != None
+
+	def server_expired(self, server, now):
+		# Servers that never answered have no last update to go by, those are left alone
+		return (
+			self.server_days != None and not server.active and server.last_update
+			and now - server.last_update > self.server_days * c_day
+		)
+
+	def expired_players(self, server, now):
+		players = [player for player in server.players if not player.active]
+
+		expired = []
+		if self.player_days != None:
+			cutoff = now - self.player_days * c_day
+			expired = [player for player in players if player.last_seen < cutoff]
+
+		if self.max_players != None and len(server.players) - len(expired) > self.max_players:
+			# Beyond the cap the players seen longest ago go first, active players are always kept
+			evicted = set(map(id, expired))
+			kept = sorted((player for player in players if id(player) not in evicted), key=lambda player: player.last_seen)
+			expired += kept[:len(server.players) - len(expired) - self.max_players]
+
+		return expired
+
+
+class ArchivePickler(pickle.Pickler):
+	# Back references are left out of the record instead of being cleared, the live objects may still be queued or mid-probe
+	def __init__(self, file, detached):
+		super().__init__(file, pickle.HIGHEST_PROTOCOL)
+		self.detached = detached
+
+	def persistent_id(self, item):
+		return isinstance(item, self.detached) and "detached" or None
+
+class ArchiveUnpickler(pickle.Unpickler):
+	def persistent_load(self, pid):
+		return None
+
+
+class Archive:
+	# Append-only (optionally gzip compressed) record file holding the pickled servers and players that were evicted
+	def __init__(self, filename):
+		self.filename = filename
+		self.file = None
+		self.count = 0
+
+	def open(self):
+		Records.repair_file(self.filename)
+		self.file = Records.open_text(self.filename, "a")
+
+	def write(self, kind, address, port, item, detached, timestamp=None):
+		if not self.file:
+			self.open()
+
+		buffer = io.BytesIO()
+		ArchivePickler(buffer, detached).dump(item)
+
+		record = {
+			"kind": kind, "address": address, "port": port, "time": timestamp or time.time(),
+			"data": base64.b64encode(buffer.getvalue()).decode()
+		}
+		self.file.write(json.dumps(record, separators=(',', ':')) + '\n')
+		self.count += 1
+
+	def flush(self):
+		if self.file:
+			self.file.flush()
+
+	def close(self):
+		if self.file:
+			self.file.close()
+			self.file = None
+
+	def archive_server(self, server, timestamp=None):
+		# The host back reference would drag the whole state along, restoring attaches the server again
+		self.write("server", server.host.address, server.port, server, DataStructure.Host, timestamp)
+
+	def archive_players(self, server, players, timestamp=None):
+		self.write("players", server.host.address, server.port, players, (DataStructure.Host, DataStructure.Server), timestamp)
+
+	def read(self, address=None, port=None):
+		for record in Records.read_records(self.filename):
+			if (address == None or record["address"] == address) and (port == None or record["port"] == port):
+				record["item"] = ArchiveUnpickler(io.BytesIO(base64.b64decode(record.pop("data")))).load()
+				yield record
+
+
+def restore(host_list, archive, address=None, port=None):
+	# Restoring merges, so restoring the same records twice doesn't duplicate anything
+	counts = {"servers": 0, "players": 0}
+
+	for record in archive.read(address, port):
+		host = host_list.get_or_add_host(record["address"])
+		server = host.get_server(record["port"])
+		item = record["item"]
+
+		if record["kind"] == "server":
+			DataStructure.g_intern_pool.intern_server(item)
+
+			if server:
+				before = Events.snapshot(server)
+				server.merge(item)
+				host.changed(server, before)
+			else:
+				host.add_server(item)
+
+			counts["servers"] += 1
+		else:
+			server = server or host.get_or_add_server(record["port"])
+			other = DataStructure.Server(None, server.port)
+			other.players = item
+
+			before = Events.snapshot(server)
+			server.merge(other)
+			host.changed(server, before)
+			counts["players"] += len(item)
+
+	return counts
+
+
+class Evictor:
+	# Walks the state a batch at a time so eviction never stalls the tracker
+	def __init__(self, host_list, policy, archive, batch_size=c_batch_size):
+		self.host_list = host_list
+		self.policy = policy
+		self.archive = archive
+		self.batch_size = batch_size
+
+		self.pending = []
+		self.evicted = 0 # Evictions in the current pass
+		self.counts = {"passes": 0, "servers": 0, "hosts": 0, "players": 0}
+
+	def start_pass(self):
+		self.pending = list(self.host_list.server_iterator())
+		self.pending.reverse() # Popped from the end
+
+	def evict_server(self, server, now):
+		host = server.host
+		host.remove_server(server.port)
+		self.archive.archive_server(server, now)
+		self.counts["servers"] += 1
+		self.evicted += 1
+
+		if not host.servers:
+			self.host_list.remove_host(host.address)
+			self.counts["hosts"] += 1
+
+	def evict_players(self, server, players, now):
+		evicted = set(map(id, players))
+		before = Events.snapshot(server)
+
+		server.players = [player for player in server.players if id(player) not in evicted]
+		server.total_play_time -= sum(player.play_time for player in players)
+		server.revision += 1
+		self.archive.archive_players(server, players, now)
+		self.counts["players"] += len(players)
+		self.evicted += 1
+
+		server.host.changed(server, before)
+
+	def step(self, now=None):
+		# Returns False once the current pass is done
+		now = now or time.time()
+		policy = self.policy
+
+		for _ in range(min(self.batch_size, len(self.pending))):
+			server = self.pending.pop()
+
+			if not server.attached():
+				continue # Removed since the pass started
+
+			if policy.server_expired(server, now):
+				self.evict_server(server, now)
+				continue
+
+			players = policy.expired_players(server, now)
+			if players:
+				self.evict_players(server, players, now)
+
+		if self.pending:
+			return True
+
+		self.archive.flush()
+
+		if self.evicted:
+			# Versions and mod lists of evicted servers would otherwise stay interned
+			DataStructure.g_intern_pool.rebuild(self.host_list.server_iterator())
+			self.evicted = 0
+
+		return False
+
+	def run_pass(self, now=None):
+		self.start_pass()
+		while self.step(now):
+			pass
+
+		self.counts["passes"] += 1
+		return self.counts
+
+	async def run(self, step_interval=c_step_interval, pass_interval=c_pass_interval):
+		import asyncio
+
+		while True:
+			self.start_pass()
+			while self.step():
+				await asyncio.sleep(step_interval)
+
+			self.counts["passes"] += 1
+			await asyncio.sleep(pass_interval)
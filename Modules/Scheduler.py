@@ -0,0 +1,329 @@
+import collections
+import asyncio
+import time
+
+c_priority_ratio = 4 # Priority items served in a row before a waiting background item gets a turn
+c_forced_overflow = 1 # Probes over the host limit a forced priority item (an explicit refresh) may add
+
+
+class MovingAverage:
+	def __init__(self, weight=0.1):
+		self.weight = weight
+		self.value = 0
+
+	def add(self, sample):
+		self.value += (sample - self.value) * self.weight
+		return self.value
+
+
+class FairQueue:
+	def __init__(self, key, limit=2, limits=None, priority_ratio=c_priority_ratio, unique=False, forced_overflow=c_forced_overflow):
+		self.key = key
+		self.limit = limit
+		self.limits = limits or {}
+		self.priority_ratio = priority_ratio
+		self.unique = unique
+		self.forced_overflow = forced_overflow
+
+		self.pending = {}
+		self.active = {}
+		self.ready = collections.deque()
+		self.ready_keys = set()
+		self.getters = collections.deque()
+		self.size = 0
+
+		self.priority = collections.deque()
+		self.priority_items = set()
+		self.priority_forced = set()
+		self.priority_streak = 0
+
+		# Unique queues skip items that are already waiting (in either lane) or being processed
+		self.waiting = set()
+		self.running = set()
+
+	def _capacity(self, key, overflow=0):
+		return self.active.get(key, 0) < self.limits.get(key, self.limit) + overflow
+
+	def _schedule(self, key):
+		if key in self.pending and key not in self.ready_keys and self._capacity(key):
+			self.ready.append(key)
+			self.ready_keys.add(key)
+			self._wakeup()
+
+	def _wakeup(self):
+		while self.getters:
+			waiter = self.getters.popleft()
+			if not waiter.done():
+				waiter.set_result(None)
+				break
+
+	def qsize(self):
+		return self.size
+
+	def empty(self):
+		return self.size == 0
+
+	def _next_ready(self):
+		# Priority items count towards the host limit too, hosts that filled up after being scheduled wait for a release
+		ready = self.ready
+		while ready and (ready[0] not in self.pending or not self._capacity(ready[0])):
+			self.ready_keys.discard(ready.popleft())
+
+		return bool(ready)
+
+	def _next_priority(self):
+		# Index of the first priority item whose host has room, the lane only changes the order and keeps to the host limit
+		for idx, [_enqueued, item] in enumerate(self.priority):
+			if self._capacity(self.key(item), item in self.priority_forced and self.forced_overflow or 0):
+				return idx
+
+		return None
+
+	def has_ready(self):
+		return self._next_ready() or self._next_priority() != None
+
+	def put_nowait(self, item):
+		if self.unique:
+			if item in self.waiting or item in self.priority_items or item in self.running:
+				return
+
+			self.waiting.add(item)
+
+		key = self.key(item)
+		self.pending.setdefault(key, collections.deque()).append((time.time(), item))
+		self.size += 1
+		self._schedule(key)
+
+	async def put(self, item):
+		self.put_nowait(item)
+
+	def put_priority(self, item, force=False):
+		# Skips the host rotation, forced items may also go forced_overflow probes over the host limit
+		if force and item in self.priority_items:
+			self.priority_forced.add(item)
+			self._wakeup()
+
+		if item in self.priority_items or item in self.running:
+			return
+
+		if force:
+			self.priority_forced.add(item)
+
+		if item in self.waiting:
+			self._unqueue(item) # Moves over from the background lane
+
+		self.priority_items.add(item)
+		self.priority.append((time.time(), item))
+		self.size += 1
+		self._wakeup()
+
+	def _unqueue(self, item):
+		key = self.key(item)
+		pending = self.pending[key]
+
+		pending.remove(next(entry for entry in pending if entry[1] is item))
+		if not pending:
+			del self.pending[key]
+
+		self.waiting.discard(item)
+		self.size -= 1
+
+	def _start(self, item):
+		if self.unique:
+			self.waiting.discard(item)
+			self.running.add(item)
+
+	def _get_priority(self, idx):
+		entry = self.priority[idx]
+		del self.priority[idx]
+
+		self.priority_items.discard(entry[1])
+		self.priority_forced.discard(entry[1])
+		self._start(entry[1])
+
+		key = self.key(entry[1])
+		self.active[key] = self.active.get(key, 0) + 1
+		self.size -= 1
+		self.priority_streak += 1
+		return entry
+
+	def get_nowait(self):
+		# The background cycle still gets every priority_ratio-th turn while both lanes have work
+		idx = self._next_priority()
+		if idx != None and not (self._next_ready() and self.priority_streak >= self.priority_ratio):
+			return self._get_priority(idx)
+
+		self._next_ready()
+
+		self.priority_streak = 0
+		key = self.ready.popleft()
+		self.ready_keys.discard(key)
+
+		pending = self.pending[key]
+		entry = pending.popleft()
+		if not pending:
+			del self.pending[key]
+
+		self._start(entry[1])
+		self.active[key] = self.active.get(key, 0) + 1
+		self.size -= 1
+
+		# Hosts rotate to the back so every host gets a turn before any host gets a second one
+		self._schedule(key)
+		return entry
+
+	async def get(self):
+		while not self.has_ready():
+			waiter = asyncio.get_running_loop().create_future()
+			self.getters.append(waiter)
+
+			try:
+				await waiter
+			except asyncio.CancelledError:
+				if waiter in self.getters:
+					self.getters.remove(waiter)
+				elif self.has_ready():
+					self._wakeup()
+				raise
+		
+		return self.get_nowait()
+
+	def release(self, item):
+		if self.unique:
+			self.running.discard(item)
+
+		key = self.key(item)
+		active = self.active[key] - 1
+
+		if active:
+			self.active[key] = active
+		else:
+			del self.active[key]
+		
+		self._schedule(key)
+
+		if self.priority:
+			self._wakeup() # Priority items of this host may have been waiting for the slot
+
+
+class WorkerPool:
+	def __init__(self, handler, queue, minimum=4, maximum=256, max_sockets=512, initial=None, interval=1):
+		self.handler = handler
+		self.queue = queue
+
+		self.minimum = max(1, minimum)
+		self.maximum = max(self.minimum, min(maximum, max_sockets))
+		self.interval = interval
+
+		self.sockets = asyncio.Semaphore(max_sockets)
+		self.max_sockets = max_sockets
+		self.open_sockets = 0
+
+		self.wait_time = MovingAverage()
+		self.probe_time = MovingAverage()
+		self.processed = 0
+		self.workers = set()
+		self.idle = set()
+		self.target = max(self.minimum, min(self.maximum, initial or self.minimum))
+		self.busy = 0
+
+		self.running = False
+
+	async def put(self, item):
+		await self.queue.put(item)
+
+	def put_nowait(self, item):
+		self.queue.put_nowait(item)
+
+	def put_priority(self, item, force=False):
+		self.queue.put_priority(item, force)
+
+	def empty(self):
+		return self.queue.empty()
+
+	async def _worker(self):
+		task = asyncio.current_task()
+
+		try:
+			while self.running and len(self.workers) <= self.target:
+				self.idle.add(task)
+				try:
+					[enqueued, item] = await self.queue.get()
+				finally:
+					self.idle.discard(task)
+
+				self.wait_time.add(time.time() - enqueued)
+				self.busy += 1
+
+				try:
+					async with self.sockets:
+						self.open_sockets += 1
+						start = time.time()
+						try:
+							followup = await self.handler(item)
+						finally:
+							self.probe_time.add(time.time() - start)
+							self.open_sockets -= 1
+
+					# Handlers can return work that doesn't need the socket (verifying players), it neither holds a socket slot nor counts as probe time
+					if followup:
+						await followup
+				finally:
+					self.queue.release(item)
+					self.busy -= 1
+					self.processed += 1
+		finally:
+			self.workers.discard(task)
+
+	def _spawn(self):
+		while len(self.workers) < self.target:
+			self.workers.add(asyncio.create_task(self._worker()))
+		
+		for task in list(self.idle)[:max(0, len(self.workers) - self.target)]:
+			self.idle.discard(task)
+			self.workers.discard(task)
+			task.cancel()
+
+	def _rescale(self):
+		size = len(self.workers)
+		idle = len(self.idle)
+
+		if self.queue.empty():
+			self.wait_time.add(0)
+
+		wait = self.wait_time.value
+		latency = self.probe_time.value
+
+		if self.queue.has_ready() and wait > latency and idle == 0:
+			# Waiting on the queue should take about as long as a probe, grow towards that (at most doubling)
+			self.target = min(self.maximum, size + max(1, min(size, int(size * (wait / max(latency, 1e-3) - 1)))))
+		elif idle > 0 and (self.queue.empty() or wait < latency / 4):
+			self.target = max(self.minimum, size - max(1, idle // 2))
+
+		self._spawn()
+
+	async def run(self):
+		self.running = True
+		self._spawn()
+
+		while self.running:
+			await asyncio.sleep(self.interval)
+			self._rescale()
+
+	def stop(self):
+		self.running = False
+
+		for task in self.workers:
+			task.cancel()
+
+	def metrics(self):
+		return {
+			"workers": len(self.workers),
+			"target": self.target,
+			"busy": self.busy,
+			"open_sockets": self.open_sockets,
+			"queued": self.queue.qsize(),
+			"wait_time": self.wait_time.value,
+			"probe_time": self.probe_time.value,
+			"processed": self.processed,
+		}
@@ -0,0 +1,252 @@
+import argparse
+import pathlib
+import json
+import zlib
+import os
+
+from Modules import StateIndex
+
+# multiprocessing and DataStructure are imported where needed, query_state only uses the layout helpers
+
+c_stop_timeout = 30 # Seconds a shard gets to save its state before it's terminated
+
+
+def shard_of(address, shards):
+	# Python's own hash is salted per process, crc32 keeps the layout stable between runs
+	return zlib.crc32(address.encode()) % shards
+
+
+def shard_filename(filename, index):
+	path = pathlib.Path(filename)
+	return str(path.with_name(f"{path.stem}.shard{index}{path.suffix}"))
+
+
+def layout_filename(state_file):
+	return state_file + ".shards"
+
+
+def read_layout(state_file):
+	path = pathlib.Path(layout_filename(state_file))
+	return path.exists() and json.loads(path.read_text())["shards"] or 0
+
+
+def state_files(state_file):
+	shards = read_layout(state_file)
+	return shards and [shard_filename(state_file, idx) for idx in range(shards)] or [state_file]
+
+
+def load_state(filename, missing_ok=False):
+	# The whole state behind a state file (every shard of a sharded one), or the servers of a scan result or capture file
+	from Modules import DataStructure
+
+	host_list = DataStructure.HostList()
+
+	if filename.endswith((".jsonl", ".jsonl.gz")):
+		host_list.deserialize_records(filename)
+		return host_list
+
+	sources = [source for source in state_files(filename) if not missing_ok or os.path.exists(source)]
+	if len(sources) == 1:
+		host_list.deserialize_file(sources[0])
+		return host_list
+
+	for source in sources:
+		other = DataStructure.HostList()
+		other.deserialize_file(source)
+		host_list.merge(other)
+
+	return host_list
+
+
+def save_state(state_file, host_list):
+	# Writes in the layout the state file currently has, so sharded runs (and the next rebalance) see the changes
+	shards = read_layout(state_file)
+
+	if not shards:
+		host_list.serialize_file(state_file)
+		return
+
+	for idx, part in enumerate(partition(host_list, shards)):
+		part.serialize_file(shard_filename(state_file, idx))
+
+
+def partition(host_list, shards):
+	from Modules import DataStructure
+
+	host_lists = [DataStructure.HostList() for _ in range(shards)]
+
+	for host in host_list.hosts:
+		target = host_lists[shard_of(host.address, shards)].get_or_add_host(host.address)
+
+		for server in list(host.servers):
+			target.add_server(server)
+
+	return host_lists
+
+
+def rebalance(state_file, shards):
+	# Moves the state between the unsharded file (0 shards) and any amount of shard files, returns False if the layout didn't change
+	current = read_layout(state_file)
+	stray = current and os.path.exists(state_file) # Written next to the shards by something that ignored the layout
+
+	if current == shards and not stray:
+		return False
+
+	from Modules import DataStructure
+
+	host_list = DataStructure.HostList()
+	sources = current and [shard_filename(state_file, idx) for idx in range(current)] or []
+
+	for source in sources + [state_file]:
+		if os.path.exists(source):
+			other = DataStructure.HostList()
+			other.deserialize_file(source)
+			host_list.merge(other)
+
+	if shards:
+		for idx, part in enumerate(partition(host_list, shards)):
+			part.serialize_file(shard_filename(state_file, idx))
+	else:
+		host_list.serialize_file(state_file)
+
+	# Anything not part of the new layout would only be a stale copy
+	stale = [shard_filename(state_file, idx) for idx in range(shards, current)]
+	if shards:
+		stale.append(state_file)
+
+	for filename in stale:
+		for path in [filename, StateIndex.index_filename(filename)]:
+			if os.path.exists(path):
+				os.remove(path)
+
+	if shards:
+		pathlib.Path(layout_filename(state_file)).write_text(json.dumps({"shards": shards}))
+	else:
+		os.remove(layout_filename(state_file))
+
+	return True
+
+
+class Coordinator:
+	# Runs one tracker process per shard and merges the server summaries they report
+	def __init__(self, target, arguments, shards):
+		self.target = target # target(index, arguments, connection), arguments point to the shard's own files
+		self.arguments = arguments
+		self.shards = shards
+
+		self.processes = []
+		self.connections = []
+		self.summaries = {} # (address, port) -> summary
+		self.shard_stats = {}
+		self.revision = 0
+		self.progress = None # What a running start, stop or resize is waiting on
+
+	def shard_arguments(self, index):
+		arguments = argparse.Namespace(**vars(self.arguments))
+		arguments.state_file = shard_filename(self.arguments.state_file, index)
+
+		if arguments.capture:
+			arguments.capture = shard_filename(arguments.capture, index)
+
+		if arguments.archive:
+			arguments.archive = shard_filename(arguments.archive, index)
+
+		return arguments
+
+	def start(self):
+		import multiprocessing
+
+		# Shards are started from inside a running event loop (and a curses session), spawning keeps them from inheriting either
+		# Not daemonic, a shard that loses its coordinator still saves its state before it exits
+		context = multiprocessing.get_context("spawn")
+
+		self.progress = "moving servers between shards"
+		rebalance(self.arguments.state_file, self.shards)
+
+		for index in range(self.shards):
+			self.progress = f"starting shard {index + 1}/{self.shards}"
+
+			[connection, child_connection] = context.Pipe()
+			process = context.Process(target=self.target, args=(index, self.shard_arguments(index), child_connection))
+			process.start()
+
+			self.processes.append(process)
+			self.connections.append(connection)
+
+		self.progress = None
+
+	def apply(self, report):
+		summaries = self.summaries
+
+		for key in report["removed"]:
+			summaries.pop(tuple(key), None)
+
+		for summary in report["servers"]:
+			summaries[(summary["address"], summary["port"])] = summary
+
+		self.shard_stats[report["shard"]] = {key: report[key] for key in ["shard", "pid", "totals", "pool"]}
+		self.revision += 1
+
+	def poll(self):
+		# Applies every pending report without blocking, returns True if anything changed
+		revision = self.revision
+
+		for connection in self.connections:
+			while connection.poll():
+				report = connection.recv()
+				if report:
+					self.apply(report)
+
+		return revision != self.revision
+
+	def totals(self):
+		from Modules import DataStructure
+
+		totals = dict.fromkeys(DataStructure.Rollup.fields, 0)
+
+		for stats in self.shard_stats.values():
+			for key, value in stats["totals"].items():
+				totals[key] += value
+
+		return totals
+
+	def stop(self):
+		# A shard that already exited (or crashed) has a closed pipe, the others still get their time to save
+		for connection in self.connections:
+			try:
+				connection.send("stop")
+			except OSError:
+				pass
+
+		# Shards send their last report and then None once their state is saved
+		for index, connection in enumerate(self.connections):
+			self.progress = f"waiting for shard {index + 1}/{len(self.connections)} to save"
+
+			try:
+				while connection.poll(c_stop_timeout):
+					report = connection.recv()
+					if not report:
+						break
+
+					self.apply(report)
+			except (EOFError, OSError):
+				pass
+
+		for process in self.processes:
+			process.join(c_stop_timeout)
+			if process.is_alive():
+				process.terminate()
+
+		self.processes = []
+		self.connections = []
+		self.progress = None
+
+	def resize(self, shards):
+		# Blocks until the old shards saved and the new ones started, the interface runs it in an executor and shows the progress
+		self.progress = "stopping shards"
+		self.stop()
+
+		self.shards = shards
+		self.summaries = {}
+		self.shard_stats = {}
+		self.start()
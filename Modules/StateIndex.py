@@ -0,0 +1,132 @@
+import heapq
+import pickle
+import os
+
+c_version = 1
+c_columns = ["address", "port", "version", "active", "active_players", "max_players", "players_seen", "mod_count", "last_update"]
+
+
+def index_filename(state_file):
+	return state_file + ".index"
+
+
+def build(host_list):
+	columns = {name: [] for name in c_columns}
+	versions = {}
+	mods = {}
+
+	for row, server in enumerate(host_list.server_iterator()):
+		values = (
+			server.host.address, server.port, server.server_version, server.active, server.active_players,
+			server.max_players, len(server.players), len(server.mods), server.last_update
+		)
+		for name, value in zip(c_columns, values):
+			columns[name].append(value)
+
+		versions.setdefault(server.server_version, []).append(row)
+		for mod_id in {mod.id for mod in server.mods}:
+			mods.setdefault(mod_id, []).append(row)
+
+	return {"version": c_version, "columns": columns, "versions": versions, "mods": mods}
+
+
+def write(state_file, host_list):
+	filename = index_filename(state_file)
+	index = build(host_list)
+
+	# The state size lets readers notice a sidecar that wasn't updated with its state
+	index["state_size"] = os.path.getsize(state_file)
+
+	with open(filename + ".tmp", "wb") as file:
+		pickle.dump(index, file, pickle.HIGHEST_PROTOCOL)
+
+	os.replace(filename + ".tmp", filename)
+
+
+def read(state_file):
+	with open(index_filename(state_file), "rb") as file:
+		index = pickle.load(file)
+
+	assert index.get("version") == c_version, "Unsupported index version, rebuild it"
+	return index
+
+
+def combine(indexes):
+	# Concatenates the indexes of several state files (shards) into one, row numbers are offset by the rows before them
+	columns = {name: [] for name in c_columns}
+	versions = {}
+	mods = {}
+
+	for index in indexes:
+		offset = len(columns["address"])
+
+		for name in c_columns:
+			columns[name].extend(index["columns"][name])
+
+		for [target, inverted] in [(versions, index["versions"]), (mods, index["mods"])]:
+			for key, rows in inverted.items():
+				target.setdefault(key, []).extend(row + offset for row in rows)
+
+	return {"version": c_version, "columns": columns, "versions": versions, "mods": mods}
+
+
+def is_stale(state_file, index):
+	return index.get("state_size") != os.path.getsize(state_file)
+
+
+def _match(inverted, text):
+	text = text.lower()
+	rows = set()
+
+	for key, key_rows in inverted.items():
+		if text in str(key).lower():
+			rows.update(key_rows)
+
+	return rows
+
+
+def query(index, address=None, version=None, mod=None, online=None, min_players=None, max_players=None, min_seen=None, sort=None, reverse=False, limit=None):
+	columns = index["columns"]
+	candidates = None
+
+	for inverted, text in [(index["versions"], version), (index["mods"], mod)]:
+		if text != None:
+			rows = _match(inverted, text)
+			candidates = rows if candidates == None else candidates & rows
+
+	if candidates == None:
+		candidates = range(len(columns["address"]))
+
+	active = columns["active"]
+	active_players = columns["active_players"]
+	players_seen = columns["players_seen"]
+	addresses = columns["address"]
+
+	def accept(row):
+		return (
+			(online == None or active[row] == online)
+			and (min_players == None or active_players[row] >= min_players)
+			and (max_players == None or active_players[row] <= max_players)
+			and (min_seen == None or players_seen[row] >= min_seen)
+			and (address == None or address in f"{addresses[row]}:{columns['port'][row]}")
+		)
+
+	rows = filter(accept, candidates)
+
+	if sort:
+		values = columns[sort]
+		# Rows without a value always go last, whichever the direction
+		key = lambda row: ((values[row] is None) != reverse, values[row] if values[row] is not None else 0)
+
+		if limit:
+			rows = (reverse and heapq.nlargest or heapq.nsmallest)(limit, rows, key=key)
+		else:
+			rows = sorted(rows, key=key, reverse=reverse)
+	elif not isinstance(candidates, range):
+		rows = sorted(rows)
+
+	for count, row in enumerate(rows):
+		if limit and count >= limit:
+			break
+
+		yield {name: columns[name][row] for name in c_columns}
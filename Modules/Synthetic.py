@@ -0,0 +1,125 @@
+import random
+import uuid
+import zlib
+import time
+
+from Modules import DataStructure
+
+c_versions = [
+	("Paper 1.20.4", 30), ("Paper 1.21.1", 20), ("1.20.1", 12), ("Spigot 1.8.8", 10), ("Velocity 3.3.0", 8),
+	("Waterfall 1.20", 6), ("1.19.2", 5), ("Purpur 1.20.6", 4), ("1.12.2", 3), ("Fabric 1.20.1", 2),
+]
+c_favicon_sizes = (2048, 20480)
+c_shared_favicons = 32 # Default/template icons shared by many servers
+c_shared_favicon_rate = 0.4
+c_missing_favicon_rate = 0.2
+c_modded_rate = 0.1
+c_mod_pool = 4000
+c_mod_count = (20, 200)
+
+
+class Generator:
+	def __init__(self, seed=0, players=100, modded_rate=c_modded_rate, favicon_sizes=c_favicon_sizes):
+		self.random = random.Random(seed)
+		self.players = players
+		self.modded_rate = modded_rate
+		self.favicon_sizes = favicon_sizes
+		self.shared_favicons = [self.favicon_bytes() for _ in range(c_shared_favicons)]
+		self.versions = [name for name, _ in c_versions]
+		self.version_weights = [weight for _, weight in c_versions]
+
+	def favicon_bytes(self):
+		return self.random.randbytes(self.random.randint(*self.favicon_sizes))
+
+	def version(self):
+		return self.random.choices(self.versions, self.version_weights)[0]
+
+	def mods(self):
+		if self.random.random() >= self.modded_rate:
+			return []
+
+		# Popular mods show up far more often than the rest, like on real modded servers
+		count = self.random.randint(*c_mod_count)
+		ids = {int(self.random.paretovariate(1.2)) % c_mod_pool for _ in range(count)}
+		return [(f"mod{mod_id}", f"{mod_id % 7}.{mod_id % 13}.0") for mod_id in ids]
+
+	def favicon(self, favicon):
+		roll = self.random.random()
+
+		if roll < c_missing_favicon_rate:
+			return
+
+		data = roll < c_missing_favicon_rate + c_shared_favicon_rate and self.random.choice(self.shared_favicons) or self.favicon_bytes()
+		favicon.crc32 = zlib.crc32(data)
+		favicon.size = len(data)
+		favicon.type = "image/png"
+		favicon.data = data
+
+	def player(self, server, now):
+		player = DataStructure.Player(server, f"Player{self.random.randrange(1 << 24)}", str(uuid.UUID(int=self.random.getrandbits(128))))
+		player.last_seen = now - self.random.random() * 86400 * 90
+		player.play_time = self.random.random() * 3600 * 50
+		player.premium_name = self.random.random() < 0.8
+		player.premium_uuid = player.premium_name
+		player.last_verified = player.last_seen
+		return player
+
+	def status(self, sample=12):
+		online = self.random.randint(0, 200)
+		status = {
+			"version": {"name": self.version(), "protocol": 765},
+			"players": {
+				"max": 200,
+				"online": online,
+				"sample": [
+					{"name": f"Player{self.random.randrange(1 << 24)}", "id": str(uuid.UUID(int=self.random.getrandbits(128)))}
+					for _ in range(min(sample, online))
+				]
+			},
+			"enforcesSecureChat": self.random.random() < 0.5,
+		}
+
+		mods = self.mods()
+		if mods:
+			status["forgeData"] = {"mods": [{"modId": mod_id, "modmarker": version} for mod_id, version in mods]}
+
+		return status
+
+	def server(self, host, port, now):
+		server = host.get_or_add_server(port)
+
+		server.server_version = DataStructure.g_intern_pool.string(self.version())
+		server.protocol_version = 765
+		server.secure_chat = self.random.random() < 0.5
+		server.mods = DataStructure.g_intern_pool.mod_list(DataStructure.Mod(mod_id, version) for mod_id, version in self.mods())
+		self.favicon(server.favicon)
+
+		server.players = [self.player(server, now) for _ in range(self.random.randint(0, self.players * 2))]
+		server.max_players = 200
+		server.active = self.random.random() < 0.7
+		server.active_players = server.active and self.random.randint(0, min(200, len(server.players))) or 0
+		server.last_update = now
+
+		for player in server.players[:server.active_players]:
+			player.active = True
+
+		server.recount()
+		host.reindex(server)
+		return server
+
+	def host_list(self, servers):
+		host_list = DataStructure.HostList()
+		now = time.time()
+		count = 0
+
+		while count < servers:
+			address = f"10.{self.random.randrange(256)}.{self.random.randrange(256)}.{self.random.randrange(1, 255)}"
+			host = host_list.get_or_add_host(address)
+
+			# Most hosts run a single server, a few run many
+			for port in range(25565, 25565 + min(servers - count, int(self.random.paretovariate(2.5)))):
+				if not host.get_server(port):
+					self.server(host, port, now)
+					count += 1
+
+		return host_list
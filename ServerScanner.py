@@ -1,17 +1,13 @@
-import subprocess
+import xml.etree.ElementTree as ElementTree
 import ipaddress
 import argparse
-import untangle
 import asyncio
-import icmplib
 import random
-import socket
 import re
 
-from tqdm import tqdm
-
-from Modules import DataStructure
+from Modules import Resolver
 from Modules import Protocol
+from Modules import Records
 
 c_randomize_ports = False
 c_randomize_hosts = False
@@ -21,14 +17,18 @@ c_nmap_path = "nmap"
 c_use_nmap = False
 c_runners = 32
 c_timeout = 5
-c_output = "scan_results.pickle"
+c_output = "scan_results.jsonl"
+c_resume = False
 c_port = 25565
 
 
 class _State:
 	task_queue = asyncio.Queue(4096)
-	host_list = DataStructure.HostList()
+	checkpoint = None
+	writer = None
 	running = True
+	hosts_found = set()
+	resolver = Resolver.Resolver(srv=False) # Scans probe addresses, not hostnames
 
 g_state = _State()
 
@@ -43,7 +43,7 @@ def parse_arguments():
 	# Optional Arguments
 	parser.add_argument(
 		"--ports", "-p", help=f"The range of ports to try (\"-p 10000-20000\", \"-p 25565\", \"-p 15-25 30-40 80 8080\") (default {c_port}).", nargs='+', required=False, type=str,
-		default=c_port
+		default=[str(c_port)]
 	)
 
 	parser.add_argument(
@@ -61,6 +61,11 @@ def parse_arguments():
 		default=c_output
 	)
 
+	parser.add_argument(
+		"--resume", help=f"Skip hosts that a previous run of the same scan already finished (defaults to {c_resume}).", required=False, action="store_true",
+		default=c_resume
+	)
+
 	parser.add_argument(
 		"--randomize-ports", help=f"Randomize ports (defaults to {c_randomize_ports}).", required=False, action="store_true",
 		default=c_randomize_ports
@@ -110,18 +115,14 @@ def unpack_ranges(ranges):
 	return ports
 
 
-def resolve_address(address):
+async def resolve_address(address):
 	try:
 		return ipaddress.ip_network(address, strict=False)
 	except ValueError:
 		pass
 
-	try:
-		return resolve_address(socket.gethostbyname(address))
-	except OSError:
-		pass
-
-	return False
+	addresses = await g_state.resolver.resolve(address)
+	return addresses and ipaddress.ip_network(addresses[0]) or False
 
 
 def randomize_iterable(iterable, randomize):
@@ -137,11 +138,15 @@ async def scanner_task(protocol, timeout):
 
 		result = await Protocol.async_server_status(host, port, protocol, timeout)
 		if result:
-			server = g_state.host_list.get_or_add_server(host, port)
-			server.parse_status(result)
+			g_state.writer.write(host, port, result)
+			g_state.hosts_found.add(host)
+
+		g_state.checkpoint.complete(host, port)
 
 
 async def ping_hosts(hosts, runners, timeout=10):
+	import icmplib
+
 	try:
 		return await icmplib.async_multiping(hosts, 1, 0, timeout, runners)
 	except (OSError, icmplib.ICMPLibError):
@@ -149,7 +154,7 @@ async def ping_hosts(hosts, runners, timeout=10):
 
 
 async def parse_hosts(arguments):
-	target = resolve_address(arguments.target)
+	target = await resolve_address(arguments.target)
 
 	assert target, f"Couldn't parse {arguments.target}"
 	
@@ -172,68 +177,121 @@ async def manual_scan(arguments):
 	port_list = await parse_ports(arguments)
 	task_size = len(host_list) * len(port_list)
 
+	from tqdm import tqdm
+
 	bar = tqdm(bar_format="{desc} Progress: {percentage:0.2f}% |{bar}{r_bar}", total=0)
 	bar.total = task_size
 	
 	task_queue = g_state.task_queue
+	checkpoint = g_state.checkpoint
 	for host_idx, host in enumerate(host_list):
-		for port_idx, port in enumerate(port_list):
+		ports = checkpoint.pending_ports(host, port_list)
+		if not ports:
+			continue
+
+		checkpoint.expect(host, len(ports))
+		for port_idx, port in enumerate(ports):
 			await task_queue.put((host, port))
 			
 			while task_queue.full():
 				await asyncio.sleep(0.05)
 			
-			bar.desc = f"{host}:{port} Found {g_state.host_list.server_count()} servers on {len(g_state.host_list)}"
+			bar.desc = f"{host}:{port} Found {g_state.writer.count} servers on {len(g_state.hosts_found)} hosts"
 			bar.n = host_idx * len(port_list) + port_idx + 1
 			bar.refresh()
 
 	bar.close()
 
-	while not task_queue.empty():
+	while g_state.checkpoint.remaining:
 		await asyncio.sleep(0.05)
 
 
+def nmap_host_ports(element):
+	address = next((item.get("addr") for item in element.iter("address") if item.get("addrtype") in ["ipv4", "ipv6"]), None)
+	ports = []
+
+	for port in element.iter("port"):
+		state = port.find("state")
+		if state != None and state.get("state") == "open":
+			ports.append(int(port.get("portid")))
+	
+	return address, ports
+
+
+async def read_nmap_hosts(stream, chunk_size=65536):
+	parser = ElementTree.XMLPullParser(["start", "end"])
+	root = None
+	depth = 0
+
+	while chunk := await stream.read(chunk_size):
+		parser.feed(chunk)
+
+		for event, element in parser.read_events():
+			if event == "start":
+				if root == None:
+					root = element
+
+				depth += 1
+				continue
+
+			depth -= 1
+			if depth != 1:
+				continue # Nested elements are read through their <host> and dropped along with it
+
+			if element.tag == "host":
+				yield nmap_host_ports(element)
+
+			# Every completed element (<host>, <hosthint>, <taskprogress>, ...) is dropped so memory stays flat no matter how large the scan is
+			element.clear()
+			root.remove(element)
+	
+	parser.close()
+
+
 async def nmap_scan(arguments):
 	global g_state
 	
-	print("Running Nmap, this might take a long time...")
-	process = subprocess.Popen(
-		[
-			arguments.nmap_path,
-			"-sS",
-			"-oX", "-",
-			f"-p {','.join(arguments.ports)}", arguments.target,
-			not arguments.ping_scan and "-Pn" or ""
-		],
-		stdout=subprocess.PIPE
+	print("Running Nmap, results are probed as soon as each host is reported...")
+	process = await asyncio.create_subprocess_exec(
+		arguments.nmap_path,
+		"-sS",
+		"-oX", "-",
+		"-p", ','.join(arguments.ports), arguments.target,
+		*(not arguments.ping_scan and ["-Pn"] or []),
+		stdout=asyncio.subprocess.PIPE
 	)
-	result = bytes()
-
-	while process.poll() == None:
-		result += process.stdout.read()
-	
-	assert process.returncode == 0, "Nmap didn't return 0, did something go wrong?"
 
 	task_queue = g_state.task_queue
-	parsed = untangle.parse(result.decode())
-
-	print("Fetching server info...")
-	for host in parsed.nmaprun.host:
-		address = host.address.get_attribute("addr")
+	checkpoint = g_state.checkpoint
 
-		if "port" not in host.ports:
+	async for [address, ports] in read_nmap_hosts(process.stdout):
+		ports = address and checkpoint.pending_ports(address, ports)
+		if not ports:
 			continue
 
-		for port_element in host.ports.port:
-			await task_queue.put((address, int(port_element.get_attribute("portid"))))
+		checkpoint.expect(address, len(ports))
+		for port in ports:
+			await task_queue.put((address, port))
+	
+	await process.wait()
+	assert process.returncode == 0, "Nmap didn't return 0, did something go wrong?"
 
-	while not task_queue.empty():
+	while g_state.checkpoint.remaining:
 		await asyncio.sleep(0.05)
 
 
 async def main():
 	arguments = parse_arguments()
 
+	g_state.checkpoint = Records.Checkpoint(
+		arguments.output + ".checkpoint",
+		{"target": arguments.target, "ports": arguments.ports, "nmap": arguments.nmap}
+	)
+	g_state.checkpoint.open(arguments.resume)
+	if arguments.resume:
+		g_state.checkpoint.skip_recorded(arguments.output)
+	g_state.writer = Records.RecordWriter(arguments.output, arguments.resume)
+
 	for _ in range(arguments.runners):
 		asyncio.create_task(scanner_task(47, arguments.timeout))
 	
@@ -243,9 +301,10 @@ async def main():
 		await manual_scan(arguments)
 	
 	g_state.running = False
+	g_state.checkpoint.close()
+	g_state.writer.close()
 
-	print("Done, writing to file...")
-	g_state.host_list.serialize_file(arguments.output)
+	print(f"Done, found {g_state.writer.count} servers on {len(g_state.hosts_found)} hosts")
 
 
 if __name__ == "__main__":
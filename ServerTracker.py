@@ -1,17 +1,23 @@
-import pyperclip
 import argparse
 import asyncio
 import pathlib
 import atexit
 import curses
-import arrow
 import json
 import time
+import os
 import sys
 
 from Modules import DataStructure
+from Modules import Scheduler
 from Modules import Protocol
+from Modules import Retention
+from Modules import Events
+from Modules import Sharding
+from Modules import Resolver
 from Modules import Elements
+from Modules import Records
+from Modules import Replay
 
 # https://github.com/aio-libs/aiodns/issues/86
 if sys.platform == "win32":
@@ -19,6 +25,13 @@ if sys.platform == "win32":
 
 
 c_premium_check = 216000 * 4 # Premium scan validity
+c_summary_sort_modes = [
+	("Hostname", lambda summary: f"{summary['address']}:{summary['port']}"),
+	("Version", lambda summary: summary["version"] or ""),
+	("Players Active", lambda summary: summary["active_players"]),
+	("Players Seen", lambda summary: summary["players_seen"]),
+	("Mod Count", lambda summary: summary["mod_count"]),
+]
 c_sort_modes = [
 	("Hostname", lambda server: f"{server.host.address}:{server.port}"),
 	("Version", lambda server: server.server_version),
@@ -27,16 +40,39 @@ c_sort_modes = [
 	("Players Seen", lambda server: len(server.players)),
 	("Mod Count", lambda server: len(server.mods)),
 ]
+c_filter_fields = {
+	"v": "version", "version": "version",
+	"m": "mod", "mod": "mod",
+	"t": "tag", "tag": "tag",
+	"p": "players", "players": "players",
+}
 c_wait_scan = 2.5 # Time to wait after all hosts have been probed before enqueueing hosts again.
 c_wait_spin = 0.5 # Time to wait before re-checking if all hosts have been scanned
+c_tick_time = 0.2 # Time between marquee steps
+c_idle_after = 10 # Seconds without input before the interface goes idle
+c_idle_poll = 0.25 # Input polling interval while idle
+c_idle_fps = 1 # Frame rate cap for state changes while idle
 c_state_file = "save_state.pickle"
+c_max_fps = 20
+c_min_runners = 4
+c_max_runners = 256
+c_max_sockets = 512
+c_host_limit = 2
 c_runners = 16
+c_capture_flush = 1 # Seconds between capture file flushes
+c_archive_file = "archive.jsonl.gz"
+c_report_interval = 1 # Seconds between shard reports to the coordinator
+c_priority_interval = 5 # Seconds between probes of the servers on screen
+c_replay_speed = 1
 
 class _State:
 	host_list = DataStructure.HostList()
 	arguments = None
 	running = True
-	queue = asyncio.Queue()
+	resolver = Resolver.Resolver()
+	capture = None
+	archive = None
+	pool = None
 
 g_state = _State()
 
@@ -48,41 +84,71 @@ def save_state():
 	global g_state
 	g_state.host_list.serialize_file(g_state.arguments.state_file)
 
+	# Saving already walks the whole state, a good time to let go of interned values nothing uses anymore
+	DataStructure.g_intern_pool.rebuild(g_state.host_list.server_iterator())
+
 
 async def scheduler():
 	global g_state
 	
 	host_list = g_state.host_list
-	queue = g_state.queue
+	pool = g_state.pool
 
 	while g_state.running:
-		if queue.empty():
+		if pool.empty():
 			save_state()
-			await asyncio.sleep(c_wait_scan)
+			await asyncio.sleep(g_state.arguments.scan_wait)
 			for server in host_list.server_iterator():
-				await queue.put(server)
+				await pool.put(server)
 
 		await asyncio.sleep(c_wait_spin)
 
-async def ping_worker():
+async def ping_server(server):
 	global g_state
 
-	while g_state.running:
-		server = await g_state.queue.get()
-		result = await Protocol.async_server_status(server.host.address, server.port)
-
-		if result:
-			server.active = True
-			server.parse_status(result)
-		else:
-			server.active = False
-			server.active_players = 0
-			for player in server.players:
-				player.active = False
-		
-		for player in server.players:
-			if time.time() - player.last_verified > c_premium_check:
-				await player.verify_premium_async()
+	# Evicted servers stay in the queue until their turn comes and can be evicted while being probed
+	if not server.attached():
+		return
+
+	address = server.host.address
+	target = await g_state.resolver.resolve_server(address, server.port)
+	result = target and await Protocol.async_server_status(address, target[1], connect_address=target[0])
+
+	if g_state.capture:
+		g_state.capture.write(server.host.address, server.port, result or None)
+
+	if not server.attached():
+		return
+
+	if result:
+		server.parse_status(result)
+	else:
+		server.set_inactive()
+
+	# Ran by the pool after the socket is released
+	return server.players and verify_players(server)
+
+async def verify_players(server):
+	for player in list(server.players):
+		if time.time() - player.last_verified > c_premium_check:
+			await player.verify_premium_async()
+
+async def replay_server(item):
+	[server, record] = item
+	Replay.apply(server, record)
+
+async def replayer():
+	global g_state
+
+	arguments = g_state.arguments
+	host_list = g_state.host_list
+
+	async for record in Replay.play(Records.read_records(arguments.replay), arguments.replay_speed):
+		if not g_state.running:
+			break
+
+		server = host_list.get_or_add_server(record["address"], record["port"])
+		await g_state.pool.put((server, record))
 
 
 def spin_text(string, size, rotation, spacing=4):
@@ -112,6 +178,60 @@ def bool_to_word(value):
 	else:
 		return '?'
 
+class HumanizeCache:
+	def __init__(self):
+		self.tick = None
+		self.cache = {}
+	
+	def get(self, timestamp, tick):
+		if tick != self.tick:
+			self.tick = tick
+			self.cache.clear()
+		
+		text = self.cache.get(timestamp)
+		if text == None:
+			import arrow
+
+			text = self.cache[timestamp] = arrow.get(timestamp).humanize()
+		
+		return text
+
+g_humanize_cache = HumanizeCache()
+
+def stream_json_list(items, indent=3):
+	padding = ' ' * indent
+	empty = True
+
+	yield '['
+	for item in items:
+		yield empty and '\n' or ',\n'
+		yield padding + json.dumps(DataStructure.get_dict(item), indent=indent).replace('\n', '\n' + padding)
+		empty = False
+	yield not empty and '\n]' or ']'
+
+def parse_count(string):
+	return int(string) if string.isdigit() else None
+
+def parse_filter(text):
+	query = {}
+
+	for token in text.split():
+		[name, separator, value] = token.partition(':')
+		field = c_filter_fields.get(name.lower())
+
+		if not separator:
+			if token.lower() in ["online", "offline"]:
+				query["online"] = token.lower() == "online"
+			else:
+				query["version"] = token
+		elif field == "players":
+			[lower, separator, upper] = value.partition('-')
+			query["players"] = (parse_count(lower), parse_count(upper if separator else lower))
+		elif field and value:
+			query[field] = value
+	
+	return query
+
 class Property:
 	def __init__(self, item_type, item):
 		self.item_type = item_type
@@ -148,6 +268,24 @@ class Property:
 					f"{host} {version} {favicon} {mods} {players}"
 				)
 
+			case "SUMMARY":
+				host = spin_textl(f"{item['address']}:{item['port']}", 26, tick)
+				version = spin_textl(item["version"] or '?', 20, tick)
+
+				screen.addstr(
+					line, 0,
+					item["active"] and "[ACTIVE]" or "[INACTIVE]",
+					item["active"] and palette.get("ONL") or palette.get("OFF")
+				)
+				screen.addstr(line, 11, f"{host} {version} Mods: {item['mod_count']:<4} {item['active_players']}({item['players_seen']})")
+
+			case "SHARD":
+				pool = item["pool"]
+				screen.addstr(
+					line, 0,
+					f"Shard {item['shard']} (pid {item['pid']}): {format_totals(item['totals'])}, Runners: {pool['busy']}/{pool['workers']}, {pool['processed']} probes"
+				)
+
 			case "PLAYER_LIST":
 				screen.addstr(line, 0, f"Players {item.active_players}/{item.max_players} ({len(item.players)} players seen), Total playtime {item.get_play_time() / 3600:0.2f}h:")
 			
@@ -164,7 +302,7 @@ class Property:
 
 				screen.addstr(
 					line, 11,
-					f"{name} ({uuid}) Premium name/uuid: {premium} Last seen {arrow.get(item.last_seen).humanize()}, Played for {item.play_time / 3600:0.2f}h"
+					f"{name} ({uuid}) Premium name/uuid: {premium} Last seen {g_humanize_cache.get(item.last_seen, tick)}, Played for {item.play_time / 3600:0.2f}h"
 				)
 			
 			case "MOD_LIST":
@@ -185,39 +323,157 @@ class Property:
 				return item[1]
 			
 			case "PLAYER_LIST":
-				return json.dumps([DataStructure.get_dict(player) for player in item.players], indent=3)
+				return "".join(stream_json_list(item.players))
 			
 			case "MOD_LIST":
-				return json.dumps([DataStructure.get_dict(mod) for mod in item.mods], indent=3)
+				return "".join(stream_json_list(item.mods))
 
 			case _ if item_type in ["SERVER", "PLAYER", "MOD"]:
 				return json.dumps(DataStructure.get_dict(item), indent=3)
 
-def build_server_info(server):
-	player_list = []
-	mod_list = []
+			case _ if item_type in ["SUMMARY", "SHARD"]:
+				return json.dumps(item, indent=3)
 
-	for player in server.players:
-		player_list.append(Property("PLAYER", player))
+class PropertyView:
+	def __init__(self, *sections):
+		self.sections = sections # Either a Property or a (item_type, items) pair
+	
+	def __len__(self):
+		return sum(isinstance(section, Property) and 1 or len(section[1]) for section in self.sections)
+	
+	def __getitem__(self, idx):
+		for section in self.sections:
+			if isinstance(section, Property):
+				if idx == 0:
+					return section
+				idx -= 1
+			else:
+				[item_type, items] = section
+				if idx < len(items):
+					return Property(item_type, items[idx])
+				idx -= len(items)
+		
+		raise IndexError("PropertyView index out of range")
 
-	for mod in server.mods:
-		mod_list.append(Property("MOD", mod))
+async def shard_reporter(index, connection):
+	# Sends every server summary once, then only the servers that changed or were removed since the last report
+	global g_state
+
+	host_list = g_state.host_list
+	changes = host_list.events.subscribe(coalesce=True)
+	servers = list(host_list.server_iterator())
+	removed = []
+
+	while True:
+		connection.send({
+			"shard": index,
+			"pid": os.getpid(),
+			"servers": [server.get_summary() for server in servers],
+			"removed": removed,
+			"totals": host_list.rollup.get(),
+			"pool": g_state.pool.metrics(),
+		})
+
+		if not g_state.running:
+			break
+
+		await asyncio.sleep(c_report_interval)
+
+		changed = {}
+		removed = []
+		for event in changes.drain():
+			if isinstance(event, Events.ServerRemoved):
+				removed.append(event.old)
+			else:
+				changed[event.server] = True
+
+		# Servers can change and get removed (or archived) within the same interval
+		servers = [server for server in changed if server.host and server.host.get_server(server.port) is server]
+
+	changes.close()
+
+async def run_shard(index, connection):
+	global g_state
 
-	return [
+	start_tracking()
+	reporter = asyncio.create_task(shard_reporter(index, connection))
+
+	try:
+		await asyncio.get_running_loop().run_in_executor(None, connection.recv)
+	except EOFError:
+		pass # The coordinator is gone without saying stop
+	finally:
+		g_state.running = False
+
+		stop_tracking()
+		save_state()
+
+	try:
+		await reporter
+		connection.send(None)
+	except OSError:
+		pass
+
+def shard_worker(index, arguments, connection):
+	# multiprocessing target, tracks a single shard until the coordinator says stop
+	global g_state
+	g_state.arguments = arguments
+	g_state.resolver.srv = not arguments.no_srv
+
+	asyncio.run(run_shard(index, connection))
+
+
+def format_totals(totals):
+	return f"{totals['online']}/{totals['servers']} servers online, {totals['active_players']} players online ({totals['players_seen']} seen), {totals['play_time'] / 3600:0.1f}h played"
+
+def build_server_info(server):
+	host_totals = g_state.host_list.rollup.get(server.host.address)
+
+	return PropertyView(
 		Property("FIELD", ("Address: ", f"{server.host.address}:{server.port}")),
+		Property("FIELD", ("Host: ", format_totals(host_totals))),
 		Property("FIELD", ("Version: ", f"{server.server_version or '?'} (Protocol: {server.protocol_version})")),
 		Property("FIELD", ("Favicon: ", f"(size: {server.favicon.size}, crc32: {server.favicon.crc32:08X})")),
 		Property("TEXT", f"Enforces secure chat: {bool_to_word(server.secure_chat)}"),
 		Property("PLAYER_LIST", server),
-		*player_list,
+		("PLAYER", server.players),
 		Property("MOD_LIST", server),
-		*mod_list
-	]
+		("MOD", server.mods)
+	)
+
+def build_server_list(filter_query, sort_key):
+	servers = g_state.host_list.index.query(**filter_query)
+	servers = list(servers if servers != None else g_state.host_list.server_iterator())
+	servers.sort(key=sort_key, reverse=True)
+
+	return PropertyView(("SERVER", servers))
+
+def draw_items(frame, scroll_frame, tick, palette):
+	scroll_frame.update()
+	scroll_frame.draw_start()
+	for _idx, rel, item in scroll_frame.iterate():
+		item.draw(rel, tick, frame, palette)
+
+		if rel == scroll_frame.cursor:
+			frame.chgat(rel, 0, -1, palette.get("HOV"))
+
+def refresh_visible(servers, refreshed, now):
+	# Servers on screen skip the background cycle, once when they show up and then every --priority-interval seconds
+	interval = g_state.arguments.priority_interval
+
+	for server in [server for server in refreshed if server not in servers]:
+		del refreshed[server]
+
+	for server in servers:
+		if now - refreshed.get(server, 0) >= interval:
+			refreshed[server] = now
+			g_state.pool.put_priority(server)
 
 def prepare_screen(screen: curses.window):
 	curses.resize_term(0, 0)
 	curses.mousemask(curses.ALL_MOUSE_EVENTS)
 	curses.curs_set(0)
+	curses.set_escdelay(25)
 	screen.clear()
 	screen.nodelay(True)
 	screen.keypad(True)
@@ -227,11 +483,7 @@ def prepare_screen(screen: curses.window):
 	if curses.can_change_color():
 		curses.init_color(curses.COLOR_WHITE, 800, 800, 800)
 
-async def interface(screen: curses.window):
-	global g_state
-
-	prepare_screen(screen)
-
+def create_palette():
 	palette = Elements.Palette()
 
 	palette.set("CMD", curses.COLOR_WHITE, curses.COLOR_CYAN) # Bottom bar
@@ -239,33 +491,50 @@ async def interface(screen: curses.window):
 
 	palette.set("ONL", curses.COLOR_WHITE, curses.COLOR_GREEN) # Online
 	palette.set("OFF", curses.COLOR_WHITE, curses.COLOR_RED) # Offline
-	
-	scroll_frame_states = []
-	scroll_frame = Elements.ScrollingFrame(screen)
-	server_view = None
-	sort_mode = 0
-	start = time.time()
-	tick = 0
 
-	sy = 0
-	sx = 0
+	return palette
 
-	def set_status(string):
-		screen.addstr(sy - 1, 0, string)
-		screen.chgat(sy - 1, 0, -1, palette.get("CMD"))
+class InterfaceLoop:
+	# Input timing, the keys every view shares and the frame cycle, used by interface and shard_interface
+	def __init__(self, screen: curses.window):
+		prepare_screen(screen)
 
-	while g_state.running:
-		key = screen.getch()
+		self.screen = screen
+		self.palette = create_palette()
+		self.renderer = Elements.Renderer(screen, g_state.arguments.max_fps)
+		self.scroll_frame = Elements.ScrollingFrame(screen)
+		self.last_input = time.time()
+		self.start = time.time()
+		self.now = time.time()
+		self.idle = False
+		self.dirty = True
+		self.tick = 0
 
-		if 0 > key:
-			await asyncio.sleep(0.05)
-		
-		delta = (time.time() - start) - 0.20
+	def poll(self):
+		key = self.screen.getch()
+		now = self.now = time.time()
+
+		if key >= 0:
+			self.last_input = now
+			self.dirty = True
+
+		self.idle = now - self.last_input > c_idle_after
+
+		delta = (now - self.start) - c_tick_time
 		if delta > 0:
-			tick += 1
-			start = time.time() - delta
-		
-		selection = scroll_frame.current_item()
+			self.start = now - min(delta, c_tick_time)
+			if not self.idle:
+				self.tick += 1
+				self.dirty = True
+
+		if key == curses.KEY_RESIZE:
+			self.renderer.invalidate()
+
+		return key
+
+	def handle_key(self, key):
+		scroll_frame = self.scroll_frame
+
 		match key:
 			case curses.KEY_UP:
 				scroll_frame.cursor -= 1
@@ -279,6 +548,101 @@ async def interface(screen: curses.window):
 			case curses.KEY_NPAGE:
 				scroll_frame.cursor += scroll_frame.size.y - 1
 			
+			case curses.KEY_HOME:
+				scroll_frame.set_scroll(0, 0)
+			
+			case curses.KEY_END:
+				scroll_frame.set_scroll(len(scroll_frame.items), len(scroll_frame.items))
+
+			case _ if key in map(ord, ['C', 'c']):
+				selection = scroll_frame.current_item()
+				if selection != None:
+					import pyperclip
+
+					pyperclip.copy(selection.text())
+
+			case _ if key in map(ord, ['Q', 'q']):
+				g_state.running = False
+
+	def new_frame(self):
+		# None while there's nothing new to draw or the frame rate cap hasn't passed yet
+		if not (self.dirty and self.renderer.ready(self.now, self.idle and 1 / c_idle_fps)):
+			return None
+
+		self.dirty = False
+
+		frame = self.renderer.new_frame()
+		[sy, sx] = frame.getmaxyx()
+		self.scroll_frame.resize(sx - 1, sy - 1)
+		self.scroll_frame.move(0, 0)
+		return frame
+
+	def draw_items(self, frame):
+		draw_items(frame, self.scroll_frame, self.tick, self.palette)
+
+	def set_status(self, frame, string):
+		[sy, _sx] = frame.getmaxyx()
+		frame.addstr(sy - 1, 0, string)
+		frame.chgat(sy - 1, 0, -1, self.palette.get("CMD"))
+
+	def spin_status(self, frame, string):
+		self.set_status(frame, spin_text(string, frame.getmaxyx()[1] - 1, self.tick))
+
+	def present(self, frame):
+		self.renderer.present(frame, self.now)
+
+	async def wait(self, key):
+		if key < 0:
+			await asyncio.sleep(self.idle and c_idle_poll or self.renderer.frame_time)
+
+async def interface(screen: curses.window):
+	global g_state
+
+	loop = InterfaceLoop(screen)
+	scroll_frame = loop.scroll_frame
+	scroll_frame_states = []
+	server_view = None
+	server_info = (None, None, None)
+	filter_text = ""
+	filter_edit = False
+	filter_query = {}
+	sort_mode = 0
+	changes = g_state.host_list.events.subscribe(coalesce=True)
+	view_revision = None
+	visible = set()
+	refreshed = {}
+	priority = not g_state.arguments.replay and g_state.arguments.priority_interval > 0
+
+	while g_state.running:
+		key = loop.poll()
+		
+		if not changes.empty():
+			changes.drain()
+			loop.dirty = True
+		
+		if server_view and view_revision != server_view.revision:
+			view_revision = server_view.revision
+			loop.dirty = True
+
+		selection = scroll_frame.current_item()
+		match key:
+			case _ if filter_edit and key >= 0 and key != curses.KEY_RESIZE:
+				if key in [27, 10, 13, curses.KEY_ENTER]:
+					filter_edit = False
+					if key == 27:
+						filter_text = ""
+				elif key in [8, 127, curses.KEY_BACKSPACE]:
+					filter_text = filter_text[:-1]
+				elif 32 <= key < 127:
+					filter_text += chr(key)
+				
+				filter_query = parse_filter(filter_text)
+				scroll_frame.set_scroll(0, 0)
+			
+			case _ if key in map(ord, ['/', 'F', 'f']):
+				if not server_view:
+					filter_edit = True
+			
 			case curses.KEY_DC:
 				if selection:
 					item = selection.item
@@ -303,41 +667,117 @@ async def interface(screen: curses.window):
 					scroll_frame.set_scroll(0, 0)
 					server_view = selection.item
 			
-			case _ if key in map(ord, ['C', 'c']):
-				if selection != None:
-					pyperclip.copy(selection.text())
-			
-			case _ if key in map(ord, ['Q', 'q']):
-				g_state.running = False
+			case _ if key in map(ord, ['R', 'r']):
+				server = server_view or (selection and selection.item)
+				if isinstance(server, DataStructure.Server) and server.attached() and not g_state.arguments.replay:
+					g_state.pool.put_priority(server, True)
+
+			case _:
+				loop.handle_key(key)
+
+		if priority:
+			refresh_visible(visible, refreshed, loop.now)
+
+		frame = loop.new_frame()
+		if frame:
+			# Draw start
+			[mode_name, mode_condition] = c_sort_modes[sort_mode]
+
+			if server_view:
+				if server_info[:2] != (server_view, server_view.revision):
+					server_info = (server_view, server_view.revision, build_server_info(server_view))
+				
+				scroll_frame.items = server_info[2]
+			else:
+				scroll_frame.items = build_server_list(filter_query, mode_condition)
+
+			loop.draw_items(frame)
+			visible = server_view and {server_view} or {item.item for _idx, _rel, item in scroll_frame.iterate()}
+
+			if filter_edit:
+				loop.set_status(frame, f"Filter (version:, mod:, tag:, players:MIN-MAX, online/offline, ENTER: Apply, ESC: Clear): {filter_text}_"[-(frame.getmaxyx()[1] - 1):])
+			else:
+				filter_status = filter_text and f", Filter: {filter_text} ({len(scroll_frame.items)} servers)" or ""
+				metrics = g_state.pool.metrics()
+				totals_status = f", {format_totals(g_state.host_list.rollup.get())}"
+				pool_status = f", Runners: {metrics['busy']}/{metrics['workers']} ({metrics['open_sockets']} sockets, {metrics['probe_time'] * 1000:0.0f}ms/probe)"
+				loop.spin_status(frame, f"↑/↓ & PAGE-UP/PAGE-DOWN: Move up/down, HOME/END: Jump to start/end, C: Copy field, V: Toggle server info view, R: Refresh server, Q: Quit, DELETE: Delete item, INSERT: Insert item, TAB: Change sort mode, /: Filter, Sort Mode: {mode_name}{totals_status}{pool_status}{filter_status}")
+			loop.present(frame)
+
+		await loop.wait(key)
+
+async def shard_interface(screen: curses.window, coordinator):
+	# Read-only view over the summaries the shards report, the full server view only exists inside each shard
+	global g_state
+
+	loop = InterfaceLoop(screen)
+	sort_mode = 0
+	resizing = None # (future, shards) while the coordinator moves to a new shard count
+	progress = None
+
+	while g_state.running:
+		key = loop.poll()
+
+		if resizing:
+			# The coordinator belongs to the executor until the resize is done, the last list stays on screen meanwhile
+			if resizing[0].done():
+				resizing[0].result()
+				resizing = None
+				loop.renderer.invalidate()
+				loop.dirty = True
+			elif progress != coordinator.progress:
+				progress = coordinator.progress
+				loop.dirty = True
+		elif coordinator.poll():
+			loop.dirty = True
+
+		match key:
+			case _ if key == ord('\t'):
+				sort_mode = (sort_mode + 1) % len(c_summary_sort_modes)
+
+			case _ if key in map(ord, ['+', '-']):
+				shards = coordinator.shards + (key == ord('+') and 1 or -1)
+				if shards > 0 and not resizing:
+					resizing = (asyncio.get_running_loop().run_in_executor(None, coordinator.resize, shards), shards)
+
+			case _:
+				loop.handle_key(key)
 
-		# Tasks before draw start
-		[mode_name, mode_condition] = c_sort_modes[sort_mode]
-		[sy, sx] = screen.getmaxyx()
-		scroll_frame.resize(sx - 1, sy - 1)
-		scroll_frame.move(0, 0)
+		frame = loop.new_frame()
+		if frame:
+			[mode_name, mode_condition] = c_summary_sort_modes[sort_mode]
 
-		# Draw start
-		screen.erase()
-		if server_view:
-			scroll_frame.items = build_server_info(server_view)
-		else:
-			servers = list(g_state.host_list.server_iterator())
-			servers.sort(key=mode_condition, reverse=True)
+			if not resizing:
+				shards = [coordinator.shard_stats[index] for index in sorted(coordinator.shard_stats)]
+				summaries = sorted(coordinator.summaries.values(), key=mode_condition, reverse=True)
+				loop.scroll_frame.items = PropertyView(("SHARD", shards), ("SUMMARY", summaries))
 
-			scroll_frame.items = list(map(lambda srv: Property("SERVER", srv), servers))
+			loop.draw_items(frame)
 
-		scroll_frame.update()
-		scroll_frame.draw_start()
-		for _idx, rel, item in scroll_frame.iterate():
-			item.draw(rel, tick, screen, palette)
+			if resizing:
+				loop.set_status(frame, f"Rebalancing into {resizing[1]} shards: {coordinator.progress or 'starting'}..."[:frame.getmaxyx()[1] - 1])
+			else:
+				totals_status = f", {format_totals(coordinator.totals())}"
+				loop.spin_status(frame, f"↑/↓ & PAGE-UP/PAGE-DOWN: Move up/down, HOME/END: Jump to start/end, C: Copy field, Q: Quit, TAB: Change sort mode, +/-: Add/remove a shard, Sort Mode: {mode_name}, Shards: {coordinator.shards}{totals_status}")
+			loop.present(frame)
 
-			if rel == scroll_frame.cursor:
-				screen.chgat(rel, 0, -1, palette.get("HOV"))
+		await loop.wait(key)
 
-		set_status(spin_text(f"↑/↓ & PAGE-UP/PAGE-DOWN: Move up/down, C: Copy field, V: Toggle server info view, Q: Quit, DELETE: Delete item, INSERT: Insert item, TAB: Change sort mode, Sort Mode: {mode_name}", sx - 1, tick))
-		screen.refresh()
+	if resizing:
+		await resizing[0] # Stopping has to wait for the resize to hand the coordinator back
 
-def parse_arguments():
+def parse_host_limits(parser, expressions):
+	limits = {}
+
+	for expression in expressions:
+		[host, separator, limit] = expression.rpartition('=')
+		if not (separator and host and limit.isdigit() and int(limit) > 0):
+			parser.error(f"'{expression}' is a invalid host limit expression (expected HOST=LIMIT with a limit greater than 0)")
+		limits[host] = int(limit)
+	
+	return limits
+
+def parse_arguments(args=None):
 	parser = argparse.ArgumentParser(description="A simple text-based user interface tool to track specific Minecraft servers")
 
 	parser.add_argument(
@@ -346,26 +786,176 @@ def parse_arguments():
 	)
 
 	parser.add_argument(
-		"--runners", "-r", help=f"Task count (defaults to {c_runners}).", required=False, type=int,
+		"--runners", "-r", help=f"Initial task count, the pool grows or shrinks from here (defaults to {c_runners}).", required=False, type=int,
 		default=c_runners
 	)
 
-	return parser.parse_args()
+	parser.add_argument(
+		"--min-runners", help=f"Minimum task count (defaults to {c_min_runners}).", required=False, type=int,
+		default=c_min_runners
+	)
 
-async def main(screen):
+	parser.add_argument(
+		"--max-runners", help=f"Maximum task count (defaults to {c_max_runners}).", required=False, type=int,
+		default=c_max_runners
+	)
+
+	parser.add_argument(
+		"--max-sockets", help=f"Maximum amount of simultaneously open sockets (defaults to {c_max_sockets}).", required=False, type=int,
+		default=c_max_sockets
+	)
+
+	parser.add_argument(
+		"--host-limit", help=f"Maximum amount of simultaneous status requests to the same host (defaults to {c_host_limit}).", required=False, type=int,
+		default=c_host_limit
+	)
+
+	parser.add_argument(
+		"--host-limits", help="Per host overrides for --host-limit (\"--host-limits 10.0.0.2=8 example.com=1\").", nargs='+', required=False, type=str,
+		default=[]
+	)
+
+	parser.add_argument(
+		"--max-fps", "-f", help=f"Maximum interface frame rate (defaults to {c_max_fps}).", required=False, type=float,
+		default=c_max_fps
+	)
+
+	parser.add_argument(
+		"--player-retention", help="Archive players that weren't seen for this many days.", required=False, type=float,
+		default=None
+	)
+
+	parser.add_argument(
+		"--server-retention", help="Archive servers that have been offline for this many days.", required=False, type=float,
+		default=None
+	)
+
+	parser.add_argument(
+		"--player-cap", help="Maximum amount of players kept per server, the ones seen longest ago are archived first.", required=False, type=int,
+		default=None
+	)
+
+	parser.add_argument(
+		"--archive", help=f"Where archived servers and players are appended to (defaults to \"{c_archive_file}\").", required=False, type=str,
+		default=c_archive_file
+	)
+
+	parser.add_argument(
+		"--no-srv", help="Don't look up SRV records for hostnames on the default port.", required=False, action="store_true",
+		default=False
+	)
+
+	parser.add_argument(
+		"--capture", help="Append every status response to this record file (compressed if it ends in \".gz\").", required=False, type=str,
+		default=None
+	)
+
+	parser.add_argument(
+		"--replay", help="Replay a capture instead of probing servers, the state file is neither loaded nor saved.", required=False, type=str,
+		default=None
+	)
+
+	parser.add_argument(
+		"--replay-speed", help=f"Replay speed relative to the capture, 0 replays as fast as possible (defaults to {c_replay_speed}).", required=False, type=float,
+		default=c_replay_speed
+	)
+
+	parser.add_argument(
+		"--shards", help="Split the state by host between this many tracker processes (0 disables sharding).", required=False, type=int,
+		default=0
+	)
+
+	parser.add_argument(
+		"--priority-interval", help=f"Seconds between probes of the servers on screen, 0 leaves them to the background cycle (defaults to {c_priority_interval}).", required=False, type=float,
+		default=c_priority_interval
+	)
+
+	parser.add_argument(
+		"--scan-wait", help=f"Seconds to wait after every server has been probed before starting over (defaults to {c_wait_scan}).", required=False, type=float,
+		default=c_wait_scan
+	)
+
+	arguments = parser.parse_args(args)
+	if arguments.max_fps <= 0:
+		parser.error("--max-fps must be greater than 0")
+
+	if arguments.host_limit <= 0:
+		parser.error("--host-limit must be greater than 0")
+
+	arguments.host_limits = parse_host_limits(parser, arguments.host_limits)
+
+	return arguments
+
+def create_pool(handler, key, unique=False):
+	arguments = g_state.arguments
+
+	return Scheduler.WorkerPool(
+		handler,
+		Scheduler.FairQueue(key, arguments.host_limit, arguments.host_limits, unique=unique),
+		arguments.min_runners, arguments.max_runners, arguments.max_sockets, arguments.runners
+	)
+
+def start_tracking():
 	global g_state
-	g_state.arguments = parse_arguments()
+	arguments = g_state.arguments
 
-	if pathlib.Path(g_state.arguments.state_file).exists():
+	if pathlib.Path(arguments.state_file).exists():
 		load_state()
-	
-	atexit.register(save_state)
 
+	if arguments.capture:
+		g_state.capture = Records.RecordWriter(arguments.capture, True, c_capture_flush)
+
+	policy = Retention.RetentionPolicy(arguments.player_retention, arguments.server_retention, arguments.player_cap)
+	if policy.enabled():
+		g_state.archive = Retention.Archive(arguments.archive)
+		asyncio.create_task(Retention.Evictor(g_state.host_list, policy, g_state.archive).run())
+
+	g_state.pool = create_pool(ping_server, lambda server: server.host.address, True)
+
+	asyncio.create_task(g_state.pool.run())
 	asyncio.create_task(scheduler())
-	for _ in range(g_state.arguments.runners):
-		asyncio.create_task(ping_worker())
+
+def stop_tracking():
+	g_state.pool.stop()
+
+	if g_state.capture:
+		g_state.capture.close()
+
+	if g_state.archive:
+		g_state.archive.close()
+
+async def main(screen):
+	global g_state
+	g_state.arguments = parse_arguments()
+	arguments = g_state.arguments
+	g_state.resolver.srv = not arguments.no_srv
+
+	if arguments.shards:
+		assert not arguments.replay, "Replays can't be sharded"
+
+		coordinator = Sharding.Coordinator(shard_worker, arguments, arguments.shards)
+		coordinator.start()
+
+		try:
+			await shard_interface(screen, coordinator)
+		finally:
+			coordinator.stop()
+		return
+
+	if arguments.replay:
+		g_state.pool = create_pool(replay_server, lambda item: item[0].host.address)
+
+		asyncio.create_task(g_state.pool.run())
+		asyncio.create_task(replayer())
+	else:
+		# Merges the shard files back if the last run was sharded
+		Sharding.rebalance(arguments.state_file, 0)
+
+		start_tracking()
+		atexit.register(save_state)
 
 	await interface(screen)
+	stop_tracking()
 
 
 if __name__ == "__main__":
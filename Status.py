@@ -1,11 +1,211 @@
+import collections
+import argparse
 import asyncio
+import time
 import json
-import sys
+import zlib
 
+from Modules import Benchmark
+from Modules import Resolver
 from Modules import Protocol
 
-async def main(host, port):
-	print(json.dumps(await Protocol.async_server_status(host, int(port)), indent=3))
+c_interval = 1
+c_concurrency = 1
+c_window = 100 # Probes the rolling statistics are computed over
+c_timeout = 5
+c_report_interval = 1
+
+
+def parse_arguments():
+	parser = argparse.ArgumentParser(description="Prints the status of a Minecraft server, or keeps probing it with --watch")
+
+	parser.add_argument("host", help="The server, with an optional port (\"example.com\" or \"10.0.0.2:25566\").", type=str)
+
+	parser.add_argument(
+		"--watch", "-w", help="Keep probing the server and report latency, failures and changes between responses.", required=False, action="store_true",
+		default=False
+	)
+
+	parser.add_argument(
+		"--interval", "-i", help=f"Seconds between the probes of each worker, 0 probes as fast as possible (defaults to {c_interval}).", required=False, type=float,
+		default=c_interval
+	)
+
+	parser.add_argument(
+		"--concurrency", "-c", help=f"Amount of workers probing at the same time (defaults to {c_concurrency}).", required=False, type=int,
+		default=c_concurrency
+	)
+
+	parser.add_argument(
+		"--count", "-n", help="Stop after this many probes (defaults to probing until interrupted).", required=False, type=int,
+		default=0
+	)
+
+	parser.add_argument(
+		"--window", help=f"Amount of recent probes the rolling statistics are computed over (defaults to {c_window}).", required=False, type=int,
+		default=c_window
+	)
+
+	parser.add_argument(
+		"--timeout", "-T", help=f"Status request timeout (defaults to {c_timeout}).", required=False, type=float,
+		default=c_timeout
+	)
+
+	return parser.parse_args()
+
+
+def flatten(item, prefix=""):
+	# Dotted keys for nested objects, lists are compared as a whole
+	if isinstance(item, dict):
+		for key, value in item.items():
+			yield from flatten(value, prefix + key + '.')
+	else:
+		yield prefix[:-1], item
+
+
+def fingerprint(status):
+	fields = dict(flatten(status))
+
+	# Favicons are long data URIs, a checksum is enough to notice a new one
+	if isinstance(fields.get("favicon"), str):
+		fields["favicon"] = f"crc32:{zlib.crc32(fields['favicon'].encode()):08X}"
+
+	return fields
+
+
+def shorten(value, size=60):
+	text = json.dumps(value)
+	return len(text) > size and text[:size - 3] + "..." or text
+
+
+class Watcher:
+	def __init__(self, window):
+		self.latencies = collections.deque(maxlen=window)
+		self.connect_times = collections.deque(maxlen=window)
+		self.read_times = collections.deque(maxlen=window)
+		self.sizes = collections.deque(maxlen=window)
+		self.failures = collections.Counter()
+		self.probes = 0
+		self.changes = 0
+		self.last_fields = None
+
+	def add(self, probe):
+		self.probes += 1
+
+		if probe.error:
+			self.failures[probe.error] += 1
+			return
+
+		self.latencies.append(probe.connect_time + probe.read_time)
+		self.connect_times.append(probe.connect_time)
+		self.read_times.append(probe.read_time)
+		# The raw packet isn't exposed, the compact JSON encoding is close to what was sent
+		self.sizes.append(len(json.dumps(probe.status, separators=(',', ':')).encode()))
+
+		fields = fingerprint(probe.status)
+		previous = self.last_fields
+		self.last_fields = fields
+
+		if previous != None:
+			for key in sorted(previous.keys() | fields.keys()):
+				if previous.get(key) != fields.get(key):
+					self.changes += 1
+					print(f"{time.strftime('%H:%M:%S')} {key}: {shorten(previous.get(key))} -> {shorten(fields.get(key))}")
+
+	def get_dict(self):
+		to_ms = lambda summary: {key: key == "count" and value or value * 1000 for key, value in summary.items()}
+
+		return {
+			"probes": self.probes,
+			"failures": dict(self.failures),
+			"changes": self.changes,
+			"latency_ms": to_ms(Benchmark.summarize(self.latencies)),
+			"connect_ms": to_ms(Benchmark.summarize(self.connect_times)),
+			"read_ms": to_ms(Benchmark.summarize(self.read_times)),
+			"size": Benchmark.summarize(self.sizes),
+		}
+
+	def format(self):
+		latency = Benchmark.summarize(self.latencies)
+		connect = Benchmark.summarize(self.connect_times)
+		read = Benchmark.summarize(self.read_times)
+		sizes = Benchmark.summarize(self.sizes)
+		failed = sum(self.failures.values())
+
+		text = f"{time.strftime('%H:%M:%S')} {self.probes} probes ({failed} failed)"
+
+		if latency["count"]:
+			text += f", latency min/p50/p99/max {latency['min'] * 1000:0.1f}/{latency['p50'] * 1000:0.1f}/{latency['p99'] * 1000:0.1f}/{latency['max'] * 1000:0.1f}ms"
+			text += f", connect/read p50 {connect['p50'] * 1000:0.1f}/{read['p50'] * 1000:0.1f}ms, {sizes['mean'] / 1024:0.1f}KiB"
+
+		if failed:
+			text += ", " + ", ".join(f"{error}: {count}" for error, count in self.failures.most_common())
+
+		return text
+
+
+async def probe_server(resolver, host, port, timeout):
+	target = await resolver.resolve_server(host, port)
+
+	if not target:
+		probe = Protocol.StatusProbe()
+		probe.error = "resolve"
+		return probe
+
+	try:
+		# The connect timeout is handled by the connection, this bounds the whole request
+		probe = await asyncio.wait_for(Protocol.async_probe_status(host, target[1], timeout=timeout, connect_address=target[0]), timeout)
+	except asyncio.exceptions.TimeoutError:
+		probe = Protocol.StatusProbe()
+		probe.error = "read_timeout"
+
+	# The request catches its own cancellation, which is how a timeout reaches it
+	if probe.error == "cancelled":
+		probe.error = probe.connect_time != None and "read_timeout" or "connect_timeout"
+
+	return probe
+
+
+async def watch(arguments, resolver, host, port):
+	watcher = Watcher(arguments.window)
+	remaining = [arguments.count or -1]
+
+	async def worker():
+		while remaining[0]:
+			remaining[0] -= 1
+			start = time.perf_counter()
+
+			watcher.add(await probe_server(resolver, host, port, arguments.timeout))
+			await asyncio.sleep(max(0, arguments.interval - (time.perf_counter() - start)))
+
+	workers = [asyncio.create_task(worker()) for _ in range(arguments.concurrency)]
+	try:
+		while not all(task.done() for task in workers):
+			await asyncio.wait(workers, timeout=c_report_interval)
+			print(watcher.format())
+	finally:
+		for task in workers:
+			task.cancel()
+
+		print(json.dumps(watcher.get_dict(), indent=3))
+
+
+async def main():
+	arguments = parse_arguments()
+	[host, _, port] = arguments.host.partition(':')
+
+	# Without a port the SRV record decides where to connect, like the game client does
+	resolver = Resolver.Resolver(srv=not port)
+	port = int(port or Resolver.c_default_port)
+
+	if arguments.watch:
+		await watch(arguments, resolver, host, port)
+	else:
+		probe = await probe_server(resolver, host, port, arguments.timeout)
+		print(json.dumps(probe.error == None and probe.status or False, indent=3))
 
 if __name__ == "__main__":
-	asyncio.run(main(*sys.argv[1].split(':')))
+	try:
+		asyncio.run(main())
+	except KeyboardInterrupt:
+		pass # --watch prints its summary when it's cancelled
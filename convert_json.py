@@ -2,6 +2,7 @@ import argparse
 import json
 
 from Modules import DataStructure
+from Modules import Sharding
 
 c_state_file = "save_state.pickle"
 c_json_file = "save_state.json"
@@ -24,8 +25,7 @@ def parse_arguments():
 def main():
 	arguments = parse_arguments()
 
-	host_list = DataStructure.HostList()
-	host_list.deserialize_file(arguments.state_file)
+	host_list = Sharding.load_state(arguments.state_file)
 
 	with open(arguments.json_file, "w") as file:
 		json.dump(DataStructure.get_dict(host_list), file, indent=4)
@@ -0,0 +1,41 @@
+import argparse
+import json
+import sys
+
+from Modules import Sharding
+
+def parse_arguments():
+	parser = argparse.ArgumentParser(description="Lists what changed between two state files (or scan results) as one JSON object per line")
+
+	parser.add_argument("old", help="The older state (.pickle) or scan result (.jsonl, .jsonl.gz) file.", type=str)
+	parser.add_argument("new", help="The newer state (.pickle) or scan result (.jsonl, .jsonl.gz) file.", type=str)
+
+	parser.add_argument(
+		"--output", "-o", help="Write the changes to this file instead of stdout.", required=False, type=str,
+		default=None
+	)
+
+	parser.add_argument(
+		"--summary", help="Only print the summary line.", required=False, action="store_true",
+		default=False
+	)
+
+	return parser.parse_args()
+
+def main():
+	arguments = parse_arguments()
+
+	old = Sharding.load_state(arguments.old)
+	new = Sharding.load_state(arguments.new)
+
+	output = arguments.output and open(arguments.output, "w", encoding="utf-8") or sys.stdout
+
+	for change in old.diff(new):
+		if not arguments.summary or change["change"] == "summary":
+			output.write(json.dumps(change) + '\n')
+	
+	if output != sys.stdout:
+		output.close()
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,60 @@
+import argparse
+import sys
+
+from Modules import DataStructure
+from Modules import Columnar
+from Modules import Sharding
+
+c_state_file = "save_state.pickle"
+c_output = "columns"
+
+def parse_arguments():
+	parser = argparse.ArgumentParser(description="Exports a state file as columnar tables (servers, players, mods and count history) for analysis tools")
+
+	parser.add_argument(
+		"--state-file", "-s", help=f"The state file to export (defaults to \"{c_state_file}\").", required=False, type=str,
+		default=c_state_file
+	)
+
+	parser.add_argument(
+		"--output", "-o", help=f"Directory the tables are written to (defaults to \"{c_output}\").", required=False, type=str,
+		default=c_output
+	)
+
+	parser.add_argument(
+		"--format", "-f", help="Table format (defaults to parquet when pyarrow is installed, npz otherwise).", required=False, type=str,
+		choices=Columnar.c_formats, default=None
+	)
+
+	parser.add_argument(
+		"--history", help="Capture or scan result files the count history table is built from.", nargs='+', required=False, type=str,
+		default=[]
+	)
+
+	parser.add_argument(
+		"--batch-size", "-b", help=f"Rows per batch and parquet row group (defaults to {Columnar.c_batch_size}).", required=False, type=int,
+		default=Columnar.c_batch_size
+	)
+
+	return parser.parse_args()
+
+def main():
+	arguments = parse_arguments()
+
+	exporter = Columnar.Exporter(arguments.output, arguments.format, arguments.batch_size)
+	shards = Sharding.read_layout(arguments.state_file)
+
+	# Shards are exported one after the other so only one of them is loaded at a time
+	for state_file in shards and [Sharding.shard_filename(arguments.state_file, idx) for idx in range(shards)] or [arguments.state_file]:
+		host_list = DataStructure.HostList()
+		host_list.deserialize_file(state_file)
+		exporter.add_host_list(host_list)
+
+	for filename in arguments.history:
+		exporter.add_records(filename)
+
+	counts = exporter.close()
+	print(f"Wrote {', '.join(f'{count} {table}' for table, count in counts.items())} rows as {exporter.format} to \"{arguments.output}\"", file=sys.stderr)
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,34 @@
+import argparse
+
+from Modules import Sharding
+
+c_state_file = "save_state.pickle"
+
+def parse_arguments():
+	parser = argparse.ArgumentParser(description="Merges scan results (or other state files) into a tracker state file")
+
+	parser.add_argument(
+		"inputs", help="The scan result or capture (.jsonl, .jsonl.gz) or state (.pickle) files to merge.", nargs='+', type=str
+	)
+
+	parser.add_argument(
+		"--state-file", "-s", help=f"The state file to merge into (defaults to \"{c_state_file}\").", required=False, type=str,
+		default=c_state_file
+	)
+
+	return parser.parse_args()
+
+def main():
+	arguments = parse_arguments()
+
+	host_list = Sharding.load_state(arguments.state_file, missing_ok=True)
+
+	for filename in arguments.inputs:
+		counts = host_list.merge(Sharding.load_state(filename))
+		print(f"{filename}: {counts['added']} added, {counts['updated']} updated, {counts['unchanged']} unchanged")
+
+	Sharding.save_state(arguments.state_file, host_list)
+	print(f"Wrote {host_list.server_count()} servers on {len(host_list.hosts)} hosts to \"{arguments.state_file}\"")
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,104 @@
+import argparse
+import pathlib
+import json
+import sys
+
+from Modules import StateIndex
+from Modules import Sharding
+
+c_state_file = "save_state.pickle"
+c_formats = ["table", "ndjson"]
+
+def parse_arguments():
+	parser = argparse.ArgumentParser(description="Queries a state file through its sidecar index without loading the whole state")
+
+	parser.add_argument(
+		"--state-file", "-s", help=f"The state file to query (defaults to \"{c_state_file}\").", required=False, type=str,
+		default=c_state_file
+	)
+
+	parser.add_argument("--address", "-a", help="Address (\"host:port\") substring.", required=False, type=str, default=None)
+	parser.add_argument("--version", "-v", help="Version substring.", required=False, type=str, default=None)
+	parser.add_argument("--mod", "-m", help="Mod id substring.", required=False, type=str, default=None)
+	parser.add_argument("--online", help="Only online servers.", required=False, action="store_const", const=True, default=None)
+	parser.add_argument("--offline", help="Only offline servers.", dest="online", required=False, action="store_const", const=False)
+	parser.add_argument("--min-players", help="Minimum active players.", required=False, type=int, default=None)
+	parser.add_argument("--max-players", help="Maximum active players.", required=False, type=int, default=None)
+	parser.add_argument("--min-seen", help="Minimum players seen.", required=False, type=int, default=None)
+
+	parser.add_argument(
+		"--sort", "-S", help="Column to sort by.", required=False, type=str,
+		choices=StateIndex.c_columns, default=None
+	)
+
+	parser.add_argument(
+		"--reverse", "-r", help="Sort in descending order.", required=False, action="store_true",
+		default=False
+	)
+
+	parser.add_argument(
+		"--limit", "-n", help="Maximum amount of results.", required=False, type=int,
+		default=None
+	)
+
+	parser.add_argument(
+		"--format", "-f", help="Output format (defaults to table).", required=False, type=str,
+		choices=c_formats, default=c_formats[0]
+	)
+
+	parser.add_argument(
+		"--rebuild", help="Rebuild the index from the state file first (loads the whole state).", required=False, action="store_true",
+		default=False
+	)
+
+	return parser.parse_args()
+
+def load_state_index(state_file, rebuild):
+	index_file = pathlib.Path(StateIndex.index_filename(state_file))
+
+	if rebuild or not index_file.exists():
+		from Modules import DataStructure
+
+		print(f"Building \"{index_file}\" from the state file...", file=sys.stderr)
+		host_list = DataStructure.HostList()
+		host_list.deserialize_file(state_file)
+		StateIndex.write(state_file, host_list)
+	
+	index = StateIndex.read(state_file)
+	if StateIndex.is_stale(state_file, index):
+		print(f"Warning: \"{index_file}\" is older than the state file, use --rebuild to update it", file=sys.stderr)
+	
+	return index
+
+def load_index(arguments):
+	shards = Sharding.read_layout(arguments.state_file)
+
+	if shards:
+		return StateIndex.combine(load_state_index(Sharding.shard_filename(arguments.state_file, idx), arguments.rebuild) for idx in range(shards))
+
+	return load_state_index(arguments.state_file, arguments.rebuild)
+
+def main():
+	arguments = parse_arguments()
+	index = load_index(arguments)
+
+	results = StateIndex.query(
+		index,
+		address=arguments.address, version=arguments.version, mod=arguments.mod, online=arguments.online,
+		min_players=arguments.min_players, max_players=arguments.max_players, min_seen=arguments.min_seen,
+		sort=arguments.sort, reverse=arguments.reverse, limit=arguments.limit
+	)
+
+	if arguments.format == "ndjson":
+		for row in results:
+			sys.stdout.write(json.dumps(row) + '\n')
+		return
+
+	print(f"{'ADDRESS':<28} {'VERSION':<24} {'ONLINE':<6} {'PLAYERS':>9} {'SEEN':>7} {'MODS':>5}")
+	for row in results:
+		address = f"{row['address']}:{row['port']}"
+		players = f"{row['active_players']}/{row['max_players']}"
+		print(f"{address:<28} {str(row['version'] or '?')[:24]:<24} {row['active'] and 'Yes' or 'No':<6} {players:>9} {row['players_seen']:>7} {row['mod_count']:>5}")
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,35 @@
+import argparse
+
+from Modules import Retention
+from Modules import Sharding
+
+c_state_file = "save_state.pickle"
+
+def parse_arguments():
+	parser = argparse.ArgumentParser(description="Restores archived servers and players into a tracker state file")
+
+	parser.add_argument("archive", help="The archive written by the tracker's retention rules.", type=str)
+
+	parser.add_argument(
+		"--state-file", "-s", help=f"The state file to restore into (defaults to \"{c_state_file}\").", required=False, type=str,
+		default=c_state_file
+	)
+
+	parser.add_argument("--address", "-a", help="Only restore records of this address.", required=False, type=str, default=None)
+	parser.add_argument("--port", "-p", help="Only restore records of this port.", required=False, type=int, default=None)
+
+	return parser.parse_args()
+
+def main():
+	arguments = parse_arguments()
+
+	host_list = Sharding.load_state(arguments.state_file, missing_ok=True)
+
+	counts = Retention.restore(host_list, Retention.Archive(arguments.archive), arguments.address, arguments.port)
+	print(f"Restored {counts['servers']} servers and {counts['players']} players")
+
+	Sharding.save_state(arguments.state_file, host_list)
+	print(f"Wrote {host_list.server_count()} servers on {len(host_list.hosts)} hosts to \"{arguments.state_file}\"")
+
+if __name__ == "__main__":
+	main()
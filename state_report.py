@@ -0,0 +1,194 @@
+import argparse
+import pathlib
+import pickle
+import json
+import sys
+
+from Modules import Sharding
+
+c_state_file = "save_state.pickle"
+c_skipped_fields = ["host", "server", "host_list", "server_map", "revision"] # Back references and derived data
+c_top = 10
+
+def parse_arguments():
+	parser = argparse.ArgumentParser(description="Reports where the memory and disk space of a state file goes")
+
+	parser.add_argument(
+		"--state-file", "-s", help=f"The state file to inspect (defaults to \"{c_state_file}\").", required=False, type=str,
+		default=c_state_file
+	)
+
+	parser.add_argument(
+		"--top", "-n", help=f"How many of the heaviest servers to list (defaults to {c_top}).", required=False, type=int,
+		default=c_top
+	)
+
+	parser.add_argument(
+		"--json", "-j", help="Print the report as JSON.", required=False, action="store_true",
+		default=False
+	)
+
+	return parser.parse_args()
+
+
+class SizeCounter:
+	def __init__(self):
+		self.seen = set()
+		self.strings = {}
+
+	def size(self, item):
+		if id(item) in self.seen:
+			return 0
+
+		self.seen.add(id(item))
+		size = sys.getsizeof(item)
+
+		if isinstance(item, str):
+			[count, _] = self.strings.get(item, (0, size))
+			self.strings[item] = (count + 1, size)
+		elif isinstance(item, dict):
+			size += sum(self.size(key) + self.size(value) for key, value in item.items())
+		elif isinstance(item, (list, tuple, set, frozenset)):
+			size += sum(self.size(value) for value in item)
+		elif hasattr(item, "__dict__"):
+			size += sys.getsizeof(item.__dict__)
+			size += sum(self.size(value) for key, value in item.__dict__.items() if key not in c_skipped_fields)
+		elif hasattr(item, "__slots__"):
+			size += sum(self.size(getattr(item, key)) for key in item.__slots__ if hasattr(item, key))
+
+		return size
+
+	def string_report(self):
+		total = 0
+		duplicate = 0
+
+		for count, size in self.strings.values():
+			total += count * size
+			duplicate += (count - 1) * size
+
+		return {"objects": sum(count for count, _ in self.strings.values()), "unique": len(self.strings), "bytes": total, "duplicate_bytes": duplicate}
+
+
+class CountingWriter:
+	def __init__(self):
+		self.size = 0
+
+	def write(self, data):
+		self.size += len(data)
+		return len(data)
+
+
+def pickled_size(items):
+	writer = CountingWriter()
+	pickler = pickle.Pickler(writer)
+
+	for item in items:
+		pickler.dump(item)
+
+	return writer.size
+
+
+def build_report(host_list, filename, top):
+	counter = SizeCounter()
+	categories = {"favicons": 0, "players": 0, "mods": 0, "servers": 0}
+	favicons = {}
+	servers = []
+	player_count = 0
+	mod_count = 0
+
+	for server in host_list.server_iterator():
+		sizes = {
+			"favicons": counter.size(server.favicon),
+			"players": counter.size(server.players),
+			"mods": counter.size(server.mods),
+		}
+		sizes["servers"] = counter.size(server) # Everything else, favicon/players/mods were already counted
+		for key, size in sizes.items():
+			categories[key] += size
+
+		favicon = server.favicon
+		if favicon.data:
+			[count, size] = favicons.get((favicon.crc32, favicon.size), (0, favicon.size))
+			favicons[(favicon.crc32, favicon.size)] = (count + 1, size)
+
+		player_count += len(server.players)
+		mod_count += len(server.mods)
+		servers.append((sum(sizes.values()), server, sizes))
+
+	servers.sort(key=lambda entry: entry[0], reverse=True)
+
+	server_list = list(host_list.server_iterator())
+	disk = {
+		"favicons": pickled_size(server.favicon.data for server in server_list),
+		"players": pickled_size(
+			[(player.name, player.uuid, player.active, player.play_time, player.last_seen, player.last_verified, player.premium_uuid, player.premium_name) for player in server.players]
+			for server in server_list
+		),
+		"mods": pickled_size([(mod.id, mod.version) for mod in server.mods] for server in server_list),
+	}
+
+	return {
+		"file": {"name": filename, "bytes": sum(pathlib.Path(name).stat().st_size for name in Sharding.state_files(filename))},
+		"counts": {"hosts": len(host_list.hosts), "servers": len(server_list), "players": player_count, "mods": mod_count},
+		"memory": {**categories, "total": sum(categories.values())},
+		"strings": counter.string_report(),
+		"favicons": {
+			"total_bytes": sum(count * size for count, size in favicons.values()),
+			"unique": len(favicons),
+			"duplicate_bytes": sum((count - 1) * size for count, size in favicons.values()),
+		},
+		"disk_estimate": disk,
+		"heaviest_servers": [
+			{"address": f"{server.host.address}:{server.port}", "players": len(server.players), "mods": len(server.mods), "bytes": total, "memory": sizes}
+			for total, server, sizes in servers[:top]
+		],
+	}
+
+
+def format_size(size):
+	for unit in ["B", "KiB", "MiB", "GiB"]:
+		if abs(size) < 1024 or unit == "GiB":
+			return f"{size:0.1f}{unit}"
+		size /= 1024
+
+
+def print_report(report):
+	counts = report["counts"]
+	memory = report["memory"]
+
+	print(f"{report['file']['name']}: {format_size(report['file']['bytes'])} on disk")
+	print(f"{counts['hosts']} hosts, {counts['servers']} servers, {counts['players']} players, {counts['mods']} mods")
+
+	print("\nMemory:")
+	for key in ["favicons", "players", "mods", "servers", "total"]:
+		print(f"  {key:<10} {format_size(memory[key]):>12} {memory[key] / max(1, memory['total']) * 100:6.1f}%")
+
+	strings = report["strings"]
+	print(f"\nStrings: {strings['objects']} objects ({strings['unique']} unique), {format_size(strings['bytes'])}, {format_size(strings['duplicate_bytes'])} duplicated")
+
+	favicons = report["favicons"]
+	print(f"Favicons: {format_size(favicons['total_bytes'])} ({favicons['unique']} unique), {format_size(favicons['duplicate_bytes'])} duplicated")
+
+	print("\nEstimated on-disk size:")
+	for key, size in report["disk_estimate"].items():
+		print(f"  {key:<10} {format_size(size):>12}")
+
+	print("\nHeaviest servers:")
+	for server in report["heaviest_servers"]:
+		print(f"  {server['address']:<28} {format_size(server['bytes']):>12} (players: {server['players']} {format_size(server['memory']['players'])}, mods: {server['mods']} {format_size(server['memory']['mods'])}, favicon: {format_size(server['memory']['favicons'])})")
+
+
+def main():
+	arguments = parse_arguments()
+
+	host_list = Sharding.load_state(arguments.state_file)
+
+	report = build_report(host_list, arguments.state_file, arguments.top)
+
+	if arguments.json:
+		print(json.dumps(report, indent=3))
+	else:
+		print_report(report)
+
+if __name__ == "__main__":
+	main()